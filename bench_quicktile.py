@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Micro-benchmarks for QuickTile's hot paths
+
+Run with ``python3 bench_quicktile.py``. Timings are in microseconds per call.
+
+These don't need an X server and are intended to catch algorithmic regressions
+(eg. per-command costs which scale with the number of monitors or panels)
+rather than to measure the end-to-end latency of a keypress.
+
+The exception is ``python3 bench_quicktile.py --x11``, which also compares the
+``MoveResizeBackend`` options by repeatedly "moving" the active window to the
+position it already occupies.
+"""
+
+from __future__ import print_function
+
+__author__ = "Stephan Sokolow (deitarion/SSokolow)"
+__license__ = "GNU GPL 2.0 or later"
+
+import cProfile, pstats, random, sys, timeit
+from contextlib import contextmanager
+
+from Xlib.error import DisplayError
+
+from quicktile.util import (Rectangle, RectangleArray, StrutPartial,
+                            UsableRegion, XInitError, fmt_table)
+
+# -- Type-Annotation Imports --
+from typing import Callable, Iterator, List, Tuple
+# --
+
+#: Size of each simulated monitor
+MONITOR_SIZE = (1920, 1080)
+
+#: Thickness of each simulated panel
+PANEL_SIZE = 30
+
+#: How many panels to split each monitor edge on the border of the desktop
+#: between. (ie. 3 gives 48 panels with 16 monitors in a 4x4 grid)
+PANELS_PER_EDGE = 3
+
+
+def make_desktop(columns: int, rows: int
+                 ) -> Tuple[List[Rectangle], List[StrutPartial]]:
+    """Generate a grid of monitors with panels on every outer edge
+
+    :param columns: How many monitors wide the desktop should be.
+    :param rows: How many monitors tall the desktop should be.
+    :returns: ``(monitors, struts)``
+    """
+    width, height = MONITOR_SIZE
+    desk_width, desk_height = width * columns, height * rows
+
+    monitors = [Rectangle(x * width, y * height, width, height)
+                for y in range(rows) for x in range(columns)]
+
+    struts = []
+    seg_w, seg_h = width // PANELS_PER_EDGE, height // PANELS_PER_EDGE
+    for col in range(columns):
+        for seg in range(PANELS_PER_EDGE):
+            start = col * width + seg * seg_w
+            struts.append(StrutPartial(top=PANEL_SIZE,
+                top_start_x=start, top_end_x=start + seg_w - 1))
+            struts.append(StrutPartial(bottom=PANEL_SIZE,
+                bottom_start_x=start, bottom_end_x=start + seg_w - 1))
+    for row in range(rows):
+        for seg in range(PANELS_PER_EDGE):
+            start = row * height + seg * seg_h
+            struts.append(StrutPartial(left=PANEL_SIZE,
+                left_start_y=start, left_end_y=start + seg_h - 1))
+            struts.append(StrutPartial(right=PANEL_SIZE,
+                right_start_y=start, right_end_y=start + seg_h - 1))
+
+    assert Rectangle(0, 0, desk_width, desk_height) == monitors[-1].union(
+        monitors[0])
+    return monitors, struts
+
+
+def naive_clip(region: UsableRegion, rect: Rectangle) -> Rectangle:
+    """Clip ``rect`` by checking every strut on the desktop, as was done
+    before :class:`quicktile.util.UsableRegion` precomputed per-monitor data.
+    """
+    rect = rect.intersect(region.find_monitor_for(rect))
+    for panel in region._strut_rects:  # pylint: disable=protected-access
+        rect = rect.subtract(panel)
+    return rect
+
+
+def time_us(func: Callable[[], object], number: int) -> str:
+    """Return the best of three runs of ``func`` in microseconds per call"""
+    best = min(timeit.repeat(func, number=number, repeat=3))
+    return '%.1f' % (best / number * 1000000)
+
+
+def bench_usable_region() -> None:
+    """Compare how UsableRegion scales with monitor and panel counts"""
+    rows = []
+    for columns, n_rows in ((1, 1), (2, 2), (4, 4)):
+        monitors, struts = make_desktop(columns, n_rows)
+        region = UsableRegion()
+        region.set_monitors(monitors)
+
+        # Two windows per monitor: One hitting panels and one that isn't
+        width, height = MONITOR_SIZE
+        tests = []
+        for mon in monitors:
+            tests.append(Rectangle(mon.x, mon.y, width // 2, height))
+            tests.append(Rectangle(mon.x + 200, mon.y + 200, 640, 480))
+
+        def rebuild(region=region, struts=struts):
+            """Force the caches to be regenerated"""
+            region.set_panels([])
+            region.set_panels(struts)
+
+        def clip(region=region, tests=tests):
+            """Clip every test rectangle"""
+            for rect in tests:
+                region.clip_to_usable_region(rect)
+
+        def clip_naive(region=region, tests=tests):
+            """Clip every test rectangle without precomputed data"""
+            for rect in tests:
+                naive_clip(region, rect)
+
+        def move(region=region, tests=tests):
+            """Move every test rectangle"""
+            for rect in tests:
+                region.move_to_usable_region(rect)
+
+        region.set_panels(struts)
+        per_rect = len(tests)
+        rows.append([
+            '%d' % len(monitors),
+            '%d' % len(struts),
+            time_us(rebuild, 20),
+            '%.1f' % (float(time_us(clip, 50)) / per_rect),
+            '%.1f' % (float(time_us(clip_naive, 50)) / per_rect),
+            '%.1f' % (float(time_us(move, 50)) / per_rect),
+        ])
+
+    print("UsableRegion scaling (microseconds per call):\n")
+    print(fmt_table(rows, ('Monitors', 'Panels', 'Rebuild', 'Clip',
+                           'Clip (naive)', 'Move')))
+
+
+def bench_rectangle_array() -> None:
+    """Compare batch geometry math against per-Rectangle method calls"""
+    rng = random.Random(0)
+    rects = [Rectangle(rng.randint(0, 3000), rng.randint(0, 2000),
+                       rng.randint(1, 900), rng.randint(1, 900))
+             for _ in range(1000)]
+    batch = RectangleArray(rects)
+    other = Rectangle(100, 100, 1500, 1500)
+
+    rows = []
+    for method in ('intersect', 'subtract', 'to_relative'):
+        def scalar(method=method):
+            """Call the method on each Rectangle"""
+            for rect in rects:
+                getattr(rect, method)(other)
+
+        def vector(method=method):
+            """Call the method once on the RectangleArray"""
+            getattr(batch, method)(other)
+
+        rows.append([method, time_us(scalar, 20), time_us(vector, 20)])
+
+    print("\nGeometry math on %d rectangles (microseconds per batch):\n" %
+          len(rects))
+    print(fmt_table(rows, ('Method', 'Rectangle', 'RectangleArray')))
+
+
+@contextmanager
+def validating_constructors() -> Iterator[None]:
+    """Temporarily route :meth:`Rectangle.from_xywh` and
+    :meth:`Rectangle.from_gdk` through the validating constructor to measure
+    what they save."""
+    fast = Rectangle.__dict__['from_xywh'], Rectangle.__dict__['from_gdk']
+    Rectangle.from_xywh = classmethod(  # type: ignore
+        lambda cls, x, y, width, height: cls(x, y, width, height))
+    Rectangle.from_gdk = classmethod(  # type: ignore
+        lambda cls, r: cls(r.x, r.y, r.width, r.height))
+    try:
+        yield
+    finally:
+        Rectangle.from_xywh, Rectangle.from_gdk = fast  # type: ignore
+
+
+def count_validations(func: Callable[[], object]) -> int:
+    """Count how many times ``func`` runs the validating constructor"""
+    profiler = cProfile.Profile()
+    profiler.runcall(func)
+    for (_, _, funcname), stat in pstats.Stats(
+            profiler).stats.items():  # type: ignore
+        if funcname == '__new__':
+            return stat[1]
+    return 0
+
+
+def bench_constructors() -> None:
+    """Measure trusted vs. validating Rectangle construction"""
+    monitors, struts = make_desktop(2, 2)
+    region = UsableRegion()
+    region.set_monitors(monitors)
+    region.set_panels(struts)
+
+    # A stand-in for the geometry math a tiling command does per keypress
+    # on windows which are each within a single monitor
+    width, height = MONITOR_SIZE
+    geoms = [((x % 2) * width + 100 + x * 7,
+              (x // 2 % 2) * height + 100 + x * 3,
+              640 + x, 480 + x) for x in range(50)]
+
+    def command():
+        """Resolve, clip, and move some window geometries"""
+        for geom in geoms:
+            rect = Rectangle.from_xywh(*geom)
+            monitor = region.find_monitor_id_for(rect)[1]
+            region.clip_to_usable_region(
+                rect.to_relative(monitor).from_relative(monitor))
+            region.move_to_usable_region(rect)
+
+    with validating_constructors():
+        rows = [['Validating', time_us(command, 100),
+                 '%.1f' % (count_validations(command) / len(geoms))]]
+    rows.append(['Trusted', time_us(command, 100),
+                 '%.1f' % (count_validations(command) / len(geoms))])
+
+    print("\nPer-window geometry math with %d windows:\n" % len(geoms))
+    print(fmt_table(rows, ('Constructors', 'us per batch',
+                           'Validations per window')))
+
+    geom = geoms[0]
+    print("\nRectangle(*geom): %sus, Rectangle.from_xywh(*geom): %sus" % (
+        time_us(lambda: Rectangle(*geom), 100000),
+        time_us(lambda: Rectangle.from_xywh(*geom), 100000)))
+
+
+def bench_reposition() -> None:
+    """Compare the :attr:`quicktile.wm.WindowManager.moveresize_backend`
+    options against a live X server"""
+    try:
+        from quicktile.wm import MOVERESIZE_BACKENDS, WindowManager
+        winman = WindowManager()
+    except (DisplayError, ImportError, ValueError, XInitError) as err:
+        print("\nSkipping reposition benchmark: %s" % err)
+        return
+
+    winman.screen.force_update()
+    winman.update_geometry_cache()
+    win = winman.screen.get_active_window()
+    if not winman.is_relevant(win):
+        print("\nSkipping reposition benchmark: No suitable active window")
+        return
+    geom = Rectangle.from_xywh(*win.get_geometry())
+
+    rows = []
+    for backend in MOVERESIZE_BACKENDS:
+        winman.moveresize_backend = backend
+
+        def move():
+            """Reposition the window and wait for the X server to catch up"""
+            with winman.transaction(sync=True):
+                winman.reposition(win, geom)
+
+        rows.append([backend, time_us(move, 20)])
+
+    print("\nRepositioning the active window (includes an X round-trip):\n")
+    print(fmt_table(rows, ('Backend', 'us per call')))
+
+
+if __name__ == '__main__':
+    bench_usable_region()
+    bench_rectangle_array()
+    bench_constructors()
+    if '--x11' in sys.argv[1:]:
+        bench_reposition()
+
+# vim: set sw=4 sts=4 expandtab :
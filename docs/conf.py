@@ -186,6 +186,9 @@ nitpick_ignore = [
 ]
 
 
+# Resolve the quoted annotations modules use to avoid importing GTK+ early
+set_type_checking_flag = True
+
 # -- Hack to work around sphinx-autodoc-typehints#124 and #38
 import inspect, sphinx_autodoc_typehints
 
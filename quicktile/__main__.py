@@ -15,9 +15,6 @@
    glance. On the other hand, `xcffib`_ binds to the newer XCB API.
  - Implement the secondary major features of WinSplit Revolution (eg.
    process-shape associations, locking/welding window edges, etc.)
- - Consider rewriting :func:`quicktile.commands.cycle_dimensions` to allow
-   command-line use to jump to a specific index without actually flickering the
-   window through all the intermediate shapes.
 
 .. _python-xlib: https://pypi.org/project/python-xlib/
 .. _xcffib: https://pypi.org/project/xcffib/
@@ -33,28 +30,28 @@ __license__ = "GNU GPL 2.0 or later"
 # pylint: disable=unsubscriptable-object
 # pylint: disable=wrong-import-order
 
-import errno, logging, os, signal, sys
+import errno, json, logging, os, signal, sys
 from argparse import ArgumentParser
+import configparser
 from configparser import ConfigParser
 
-from Xlib.display import Display as XDisplay
-from Xlib.error import DisplayConnectionError
-
-import gi
-gi.require_version('GLib', '2.0')
-gi.require_version('Gtk', '3.0')
-gi.require_version('Wnck', '3.0')
-from gi.repository import GLib, Gtk, Wnck
-
-from . import commands, layout
-from .util import fmt_table, XInitError
+# Everything which pulls in GTK+, Wnck, or python-xlib is imported inside the
+# functions that need it so that commands which can be handed off to a running
+# daemon via :mod:`quicktile.client` don't pay to load them.
 from .version import __version__
-from .wm import WindowManager
 
 # -- Type-Annotation Imports --
-from typing import Dict, Union
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple, Union
 from typing import Optional  # NOQA pylint: disable=unused-import
 
+if TYPE_CHECKING:  # pragma: no cover
+    from gi.repository import Gio, GLib  # NOQA pylint: disable=W0611
+    from .commands import CommandRegistry  # NOQA pylint: disable=W0611
+    from .keybinder import CommandBindings  # NOQA pylint: disable=W0611
+    from .layout import PresetTable  # NOQA pylint: disable=unused-import
+    from .socket_api import ControlSocket  # NOQA pylint: disable=W0611
+    from .wm import WindowManager  # NOQA pylint: disable=unused-import
+
 #: MyPy type alias for fields loaded from config files
 CfgDict = Dict[str, Union[str, int, float, bool, None]]  # pylint:disable=C0103
 # --
@@ -63,6 +60,10 @@ CfgDict = Dict[str, Union[str, int, float, bool, None]]  # pylint:disable=C0103
 XDG_CONFIG_DIR = os.environ.get('XDG_CONFIG_HOME',
                                 os.path.expanduser('~/.config'))
 
+#: Location for cache files (determined at runtime).
+XDG_CACHE_DIR = os.environ.get('XDG_CACHE_HOME',
+                               os.path.expanduser('~/.cache'))
+
 #: Default content for the configuration file
 #:
 #: .. todo:: Figure out a way to show :data:`DEFAULTS` documentation but with
@@ -72,7 +73,9 @@ DEFAULTS = {
         # Use Ctrl+Alt as the default base for key combinations
         'ModMask': '<Ctrl><Alt>',
         'MovementsWrap': True,
-        'ColumnCount': 3
+        'MoveResizeBackend': 'wnck',
+        'ColumnCount': 3,
+        'StrutScanInterval': 60,
     },
     'keys': {
         "KP_Enter": "monitor-switch",
@@ -113,8 +116,6 @@ KEYLOOKUP = {
     '-': 'minus',
 }
 
-Wnck.set_client_type(Wnck.ClientType.PAGER)
-
 
 class QuickTileApp(object):
     """The basic Glib application itself.
@@ -124,17 +125,34 @@ class QuickTileApp(object):
         command names.
     :param modmask: A modifier mask to prepend to all ``keys``.
     :param winman: The window manager to invoke commands with so they can act.
+    :param config_path: The config file to watch for changes and reload, if
+        any.
+    :param cache_path: Where :func:`load_config_cached` should cache the
+        reloaded config.
     """
 
-    def __init__(self, winman: WindowManager,
-                 commands: commands.CommandRegistry,
+    #: How many milliseconds to wait for a burst of changes to the config file
+    #: (eg. an editor's save sequence) to finish before reloading it
+    config_reload_delay = 250
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, winman: 'WindowManager',
+                 commands: 'CommandRegistry',
                  keys: Dict[str, str],
                  modmask: str='',
+                 config_path: str=None,
+                 cache_path: str=None,
                  ):
         self.winman = winman
         self.commands = commands
+        self.config_path = config_path
+        self.cache_path = cache_path
         self._keys = keys or {}
         self._modmask = modmask or ''
+        self._bindings = None  # type: Optional[CommandBindings]
+        self._config_monitor = None  # type: Optional[Gio.FileMonitor]
+        self._reload_timer = None  # type: Optional[int]
+        self._control_socket = None  # type: Optional[ControlSocket]
 
     def run(self) -> bool:
         """Initialize keybinding and D-Bus if available, then call
@@ -143,17 +161,24 @@ class QuickTileApp(object):
         :returns: :any:`False` if none of the supported backends
             were available.
         """
+        from gi.repository import GLib, Gtk
 
         # Attempt to set up the global hotkey support
         try:
             from . import keybinder
         except ImportError:
-            o_keybinder = None  # type: Optional[keybinder.KeyBinder]
             logging.error("Could not find python-xlib. Cannot bind keys.")
         else:
-            o_keybinder = keybinder.init(
+            self._bindings = keybinder.init(
                 self._modmask, self._keys, self.commands, self.winman)
 
+        # Now that something is pumping X events, let the window manager
+        # keep its panel reservation cache current instead of rescanning
+        if self._bindings:
+            self._bindings.keybinder.add_xevent_handler(
+                self.winman.handle_xevent)
+            self.winman.watch_struts()
+
         # Attempt to set up the D-Bus API
         try:
             from . import dbus_api
@@ -164,27 +189,123 @@ class QuickTileApp(object):
         else:
             dbus_result = dbus_api.init(self.commands, self.winman)
 
-        # If either persistent backend loaded, start the GTK main loop.
-        if o_keybinder or dbus_result:
+        # The control socket only needs the standard library
+        from . import socket_api
+        self._control_socket = socket_api.init(self.commands, self.winman)
+
+        # If any persistent backend loaded, start the GTK main loop.
+        if self._bindings or dbus_result or self._control_socket:
+            if self.config_path:
+                self.watch_config()
+
+            # Leave the main loop on Ctrl+C or a polite kill rather than
+            # dying in it, so queued state still gets written back
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signum,
+                                     self.cb_quit)
+
             try:
                 Gtk.main()
             except KeyboardInterrupt:
                 pass
+            self.shutdown()
             return True
         else:
             return False
 
-    def show_binds(self) -> None:
-        """Print a formatted readout of defined keybindings and the modifier
-        mask to stdout.
+    @staticmethod
+    def cb_quit() -> bool:
+        """Signal handler to make :meth:`run` return via :func:`Gtk.main_quit`
+        """
+        from gi.repository import Gtk
+        Gtk.main_quit()
+        return True
+
+    def shutdown(self) -> None:
+        """Write back anything still queued and close the control socket"""
+        self.winman.flush_cycle_pos()
+        if self._control_socket:
+            self._control_socket.close()
+            self._control_socket = None
+
+    def watch_config(self) -> None:
+        """Reload :attr:`config_path` whenever it changes"""
+        from gi.repository import Gio
+
+        self._config_monitor = Gio.File.new_for_path(
+            self.config_path).monitor_file(Gio.FileMonitorFlags.NONE, None)
+        self._config_monitor.connect('changed', self.cb_config_changed)
+
+    def cb_config_changed(self, monitor: 'Gio.FileMonitor', gfile: 'Gio.File',
+            other_file: 'Optional[Gio.File]',
+            event_type: 'Gio.FileMonitorEvent') -> None:
+        """:class:`Gio.FileMonitor` callback to schedule a config reload
+
+        Changes are debounced by :attr:`config_reload_delay` so a file which
+        is still being written is never read.
+        """
+        from gi.repository import Gio, GLib
+
+        if event_type not in (Gio.FileMonitorEvent.CHANGED,
+                              Gio.FileMonitorEvent.CHANGES_DONE_HINT,
+                              Gio.FileMonitorEvent.CREATED):
+            return
+
+        if self._reload_timer is not None:
+            GLib.source_remove(self._reload_timer)
+        self._reload_timer = GLib.timeout_add(self.config_reload_delay,
+                                              self.reload_config)
+
+    def reload_config(self) -> bool:
+        """Re-read :attr:`config_path` and apply it to the running daemon
 
-        .. todo:: Look into moving this keybind pretty-printing into
-            :class:`quicktile.keybinder.KeyBinder`
+        Keybindings are updated via :meth:`CommandBindings.update
+        <quicktile.keybinder.CommandBindings.update>`, so only keys whose
+        bindings changed get grabbed or released.
+
+        :returns: Always :any:`False` so it can be used as a one-shot
+            :func:`GLib.timeout_add` callback.
         """
+        self._reload_timer = None
+        try:
+            # Read everything before touching the running state so a broken
+            # config leaves it as it was
+            config, presets = load_config_cached(self.config_path,
+                                                 self.cache_path)
+            validate_config(config)
+            keys = dict(config.items('keys'))
+            modmask = config.get('general', 'ModMask')
+
+            apply_config(self.commands, config, presets, replace=True)
+            configure_winman(self.winman, config)
+
+            self._keys, self._modmask = keys, modmask
+            if self._bindings:
+                self._bindings.update(modmask, keys)
+        except (OSError, TypeError, ValueError, configparser.Error) as err:
+            logging.error("Not reloading %s: %s", self.config_path, err)
+            return False
 
-        print("Keybindings defined for use with --daemonize:\n")
-        print("Modifier: %s\n" % (self._modmask or '(none)'))
-        print(fmt_table(self._keys, ('Key', 'Action')))
+        logging.info("Reloaded %s", self.config_path)
+        return False
+
+
+def show_binds(keys: Dict[str, str], modmask: str) -> None:
+    """Print a formatted readout of defined keybindings and the modifier
+    mask to stdout.
+
+    :param keys: A dict mapping :func:`Gtk.accelerator_parse` strings to
+        command names.
+    :param modmask: The modifier mask prepended to all ``keys``.
+
+    .. todo:: Look into moving this keybind pretty-printing into
+        :class:`quicktile.keybinder.KeyBinder`
+    """
+    from .util import fmt_table
+
+    print("Keybindings defined for use with --daemonize:\n")
+    print("Modifier: %s\n" % (modmask or '(none)'))
+    print(fmt_table(keys, ('Key', 'Action')))
 
 
 def load_config(path) -> ConfigParser:
@@ -279,7 +400,154 @@ def load_config(path) -> ConfigParser:
     return config
 
 
-def wnck_log_filter(domain: str, level: GLib.LogLevelFlags,
+def config_cache_key(path: str) -> List[Any]:
+    """Identify the current revision of a config file for
+    :func:`load_config_cached`.
+
+    :raises OSError: ``path`` could not be examined.
+    """
+    stat = os.stat(path)
+    return [__version__, os.path.abspath(path), stat.st_mtime_ns, stat.st_size]
+
+
+def load_config_cached(path: str, cache_path: str
+                       ) -> Tuple[ConfigParser, 'PresetTable']:
+    """Load the config file and the tiling presets it calls for, reusing what
+    a previous run saved to ``cache_path`` if neither the config file nor
+    QuickTile's version have changed since.
+
+    A cache hit skips all of :func:`load_config`'s parsing and migration work
+    and the generation of the presets for each :ref:`ColumnCount
+    <ColumnCount>`.
+
+    :param path: The path to load or initialize.
+    :param cache_path: The JSON file to read and update the cache in.
+
+    :raises TypeError: See :func:`load_config`.
+    :raises ValueError: :ref:`ColumnCount <ColumnCount>` is not a
+        comma-separated list of integers.
+    """
+    from .layout import PresetTable
+
+    try:
+        with open(cache_path) as cache_file:
+            cached = json.load(cache_file)
+        if cached['key'] == config_cache_key(path):
+            config = ConfigParser(interpolation=None)
+            config.optionxform = str  # type: ignore
+            config.read_dict(cached['config'])
+            return config, PresetTable(cached['column_counts'], {
+                int(columns): {command: [tuple(x) for x in presets]
+                               for command, presets in layout.items()}
+                for columns, layout in cached['layouts'].items()})
+    except (AttributeError, KeyError, OSError, TypeError, ValueError) as err:
+        logging.debug("Not using config cache %s: %s", cache_path, err)
+
+    config = load_config(path)
+
+    # ColumnCount may be a comma-separated list with one entry per monitor
+    presets = PresetTable([int(x) for x in
+        config.get('general', 'ColumnCount').split(',')])
+    for monitor_id in range(len(presets.column_counts)):
+        presets.layout_for(monitor_id)
+
+    # Write to a temporary file first so concurrent runs never see half
+    tmp_path = '%s.%d.tmp' % (cache_path, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(tmp_path, 'w') as cache_file:
+            json.dump({
+                # Taken after load_config since it may have rewritten the file
+                'key': config_cache_key(path),
+                'config': {section: dict(config.items(section))
+                           for section in config.sections()},
+                'column_counts': presets.column_counts,
+                'layouts': presets.layouts,
+            }, cache_file, separators=(',', ':'))
+        os.replace(tmp_path, cache_path)
+    except OSError as err:
+        logging.warning("Could not write config cache %s: %s",
+                        cache_path, err)
+
+    return config, presets
+
+
+def apply_config(registry: 'CommandRegistry', config: ConfigParser,
+                 presets: 'PresetTable', replace: bool=False) -> None:
+    """Make a loaded config and its tiling presets available to commands
+
+    :param registry: The command registry to update.
+    :param config: The config returned by :func:`load_config_cached`.
+    :param presets: The tiling presets returned by :func:`load_config_cached`.
+    :param replace: Whether the preset commands are being re-registered.
+    """
+    from . import commands
+
+    commands.cycle_dimensions = registry.add_many(
+        presets.default_layout, replace=replace,
+        needs=commands.NEEDS_ALL | {'repeat', 'index'}
+    )(commands.cycle_dimensions)
+    registry.extra_state = {'config': config, 'presets': presets}
+
+
+def validate_config(config: ConfigParser) -> None:
+    """Replace typed values in ``config`` which don't parse with their
+    defaults, warning about each one, so code reading them later can't fail.
+
+    (:ref:`ColumnCount <ColumnCount>` is checked by :func:`load_config_cached`
+    and :ref:`MoveResizeBackend <MoveResizeBackend>` by
+    :func:`configure_winman`.)
+    """
+    for key, getter in (('MovementsWrap', config.getboolean),
+                        ('StrutScanInterval', config.getint)):
+        try:
+            getter('general', key)
+        except ValueError:
+            default = str(DEFAULTS['general'][key])
+            logging.warning("Invalid %s %r in config file. Using %r.",
+                            key, config.get('general', key), default)
+            config.set('general', key, default)
+
+
+def configure_winman(winman: 'WindowManager', config: ConfigParser) -> None:
+    """Apply the settings in a loaded config to the window manager
+
+    :param winman: The window manager to update.
+    :param config: The config returned by :func:`load_config_cached` after
+        checking it with :func:`validate_config`.
+    """
+    from .wm import MOVERESIZE_BACKENDS
+
+    winman.strut_scan_interval = config.getint('general', 'StrutScanInterval')
+
+    backend = config.get('general', 'MoveResizeBackend').strip().lower()
+    if backend in MOVERESIZE_BACKENDS:
+        winman.moveresize_backend = backend
+    else:
+        logging.error("Unrecognized MoveResizeBackend %r. Using %r.",
+                      backend, winman.moveresize_backend)
+
+
+def init_gi() -> None:
+    """Load and configure the GObject Introspection bindings QuickTile uses.
+
+    This is deferred until it's clear that the command line can't just be
+    handed off to a running daemon, since loading GTK+ and Wnck dominates
+    QuickTile's start-up time.
+    """
+    import gi
+    gi.require_version('Gio', '2.0')
+    gi.require_version('GLib', '2.0')
+    gi.require_version('Gtk', '3.0')
+    gi.require_version('Wnck', '3.0')
+    from gi.repository import GLib, Wnck
+
+    GLib.log_set_handler('Wnck', GLib.LogLevelFlags.LEVEL_WARNING,
+        wnck_log_filter)
+    Wnck.set_client_type(Wnck.ClientType.PAGER)
+
+
+def wnck_log_filter(domain: str, level: 'GLib.LogLevelFlags',
         message: str, userdata: object=None):
     """A custom function for :func:`GLib.log_set_handler` which filters out
     the spurious error about ``_OB_WM_ACTION_UNDECORATE`` being un-handled.
@@ -290,6 +558,7 @@ def wnck_log_filter(domain: str, level: GLib.LogLevelFlags,
     :param message: The error message
     :param userdata: Required by the API but unused.
     """
+    from gi.repository import GLib
 
     if '_OB_WM_ACTION_UNDECORATE' not in message:
         # The "or 0" works around a bug where it's documented as accepting
@@ -308,8 +577,8 @@ def argparser() -> ArgumentParser:
             version="%%(prog)s v%s" % __version__)
     parser.add_argument('-d', '--daemonize', action="store_true",
         default=False, help="Attempt to set up global "
-        "keybindings using python-xlib and a D-Bus service using dbus-python. "
-        "Exit if neither succeeds.")
+        "keybindings using python-xlib, a D-Bus service using dbus-python, "
+        "and a control socket in $XDG_RUNTIME_DIR. Exit if none succeed.")
     parser.add_argument('-b', '--bindkeys', action="store_true",
         dest="daemonize", default=False, help="Old alias for --daemonize")
     parser.add_argument('--debug', action="store_true", default=False,
@@ -318,9 +587,11 @@ def argparser() -> ArgumentParser:
         default=False, help="Disable the error-handling dialog to allow for "
         "use in unattended scripting.")
     parser.add_argument('--no-workarea', action="store_true",
-        default=False, help="No effect. Retained for compatibility.")
+        default=False, help="Ignore the work areas published by the window "
+        "manager and calculate usable space from panel reservations instead.")
     parser.add_argument('command', action="store", nargs="*",
-        help="Window-tiling command to execute")
+        help="Window-tiling command to execute (append @N to jump straight "
+        "to the Nth shape, counting from 0, for commands that cycle)")
 
     help_group = parser.add_argument_group("Additional Help")
     help_group.add_argument('--show-bindings', action="store_true",
@@ -352,20 +623,57 @@ def main() -> None:
     logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO,
                         format='%(levelname)s: %(message)s')
 
+    # Let an already-running daemon execute plain commands if there is one
+    if args.command and not (args.daemonize or args.show_bindings or
+                             args.show_actions):
+        from .client import forward_commands
+        results = forward_commands(args.command)
+        if results is not None:
+            for command, found in zip(args.command, results):
+                if not found:
+                    logging.error("Command failed or unrecognized: %s",
+                                  command)
+            return
+
+    # Listing things only needs the config and the command registry, neither
+    # of which loads GTK+, Wnck, or python-xlib
+    from . import commands
+
     cfg_path = os.path.join(XDG_CONFIG_DIR, 'quicktile.cfg')
+    cache_path = os.path.join(XDG_CACHE_DIR, 'quicktile', 'config.json')
     first_run = not os.path.exists(cfg_path)
-    config = load_config(cfg_path)
+    config, presets = load_config_cached(cfg_path, cache_path)
+    validate_config(config)
+    apply_config(commands.commands, config, presets)
 
-    commands.cycle_dimensions = commands.commands.add_many(
-        layout.make_winsplit_positions(config.getint('general', 'ColumnCount'))
-    )(commands.cycle_dimensions)
-    commands.commands.extra_state = {'config': config}
+    keys = dict(config.items('keys'))
+    modmask = config.get('general', 'ModMask')
 
-    GLib.log_set_handler('Wnck', GLib.LogLevelFlags.LEVEL_WARNING,
-        wnck_log_filter)
+    if args.show_bindings:
+        show_binds(keys, modmask)
+    if args.show_actions:
+        print(commands.commands)
+
+    if not args.daemonize:
+        if first_run:
+            return
+        elif not args.command:
+            if not args.show_actions and not args.show_bindings:
+                print(commands.commands)
+                print("\nUse --help for a list of valid options.")
+                sys.exit(errno.ENOENT)
+            return
+
+    init_gi()
+    from gi.repository import Gtk
+    from Xlib.display import Display as XDisplay
+    from Xlib.error import DisplayConnectionError
+
+    from .util import XInitError
+    from .wm import WindowManager
 
-    from . import gtkexcepthook
     if not args.no_excepthook:
+        from . import gtkexcepthook
         gtkexcepthook.enable()
 
     try:
@@ -383,37 +691,25 @@ def main() -> None:
     except XInitError as err:
         logging.critical("%s", err)
         sys.exit(1)
-
-    app = QuickTileApp(winman,
-                       commands.commands,
-                       keys=dict(config.items('keys')),
-                       modmask=config.get('general', 'ModMask'))
-
-    if args.show_bindings:
-        app.show_binds()
-    if args.show_actions:
-        print(commands.commands)
+    winman.use_workarea_hints = not args.no_workarea
+    configure_winman(winman, config)
 
     if args.daemonize:
-        # Restore PyGTK-like Ctrl+C behaviour for easy development
-        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        app = QuickTileApp(winman, commands.commands,
+                           keys=keys, modmask=modmask,
+                           config_path=cfg_path, cache_path=cache_path)
 
         if not app.run():
-            logging.critical("Neither the Xlib nor the D-Bus backends were "
-                             "available")
+            logging.critical("None of the Xlib, D-Bus, or control socket "
+                             "backends were available")
             sys.exit(errno.ELIBACC)
-    elif not first_run:
-        if args:
-            winman.screen.force_update()
-
-            for arg in args.command:
-                commands.commands.call(arg, winman)
-            while Gtk.events_pending():
-                Gtk.main_iteration()
-        elif not args.show_actions and not args.show_bindings:
-            print(commands.commands)
-            print("\nUse --help for a list of valid options.")
-            sys.exit(errno.ENOENT)
+    else:
+        winman.screen.force_update()
+
+        for arg in args.command:
+            commands.commands.call(arg, winman)
+        while Gtk.events_pending():
+            Gtk.main_iteration()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,172 @@
+"""Thin client for handing commands off to an already-running QuickTile
+
+Nothing in here may import GTK+, Wnck, or python-xlib. The whole point is to
+let scripted ``quicktile <command>`` invocations skip loading them, opening X
+connections, and scanning the desktop when a ``--daemonize`` instance is
+already doing all of that.
+"""
+
+__author__ = "Stephan Sokolow (deitarion/SSokolow)"
+__license__ = "GNU GPL 2.0 or later"
+
+import logging, os, socket
+
+# -- Type-Annotation Imports --
+from typing import List, Optional, Sequence, Tuple
+# --
+
+#: The well-known D-Bus name claimed by :mod:`quicktile.dbus_api`
+BUS_NAME = 'com.ssokolow.QuickTile'
+
+#: The object path :class:`quicktile.dbus_api.QuickTile` is exported at
+OBJECT_PATH = '/com/ssokolow/QuickTile'
+
+#: The D-Bus interface the QuickTile methods are exported under
+INTERFACE = 'com.ssokolow.QuickTile'
+
+#: Status words sent back by :mod:`quicktile.socket_api` for each command
+STATUS_OK, STATUS_UNKNOWN, STATUS_ERROR = 'ok', 'unknown', 'error'
+
+
+def socket_path() -> Optional[str]:
+    """Return the path of the control socket for the current X display
+
+    :returns: A path inside ``$XDG_RUNTIME_DIR`` or :any:`None` if it isn't
+        set, since the fallbacks are readable by other users.
+    """
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if not runtime_dir:
+        return None
+
+    # Strip the screen number so ``:0`` and ``:0.0`` share a socket
+    display = strip_screen(os.environ.get('DISPLAY', ''))
+    return os.path.join(runtime_dir,
+                        'quicktile-%s.sock' % display.replace(os.sep, '_'))
+
+
+def strip_screen(name: str) -> str:
+    """Remove the screen number (if any) from an X display name
+
+    (eg. ``host:10.1`` becomes ``host:10``)
+    """
+    host, sep, number = name.rpartition(':')
+    return host + sep + number.split('.')[0] if sep else name
+
+
+def same_display(first: str, second: str) -> bool:
+    """Check whether two X display names refer to the same display
+
+    The screen number is ignored so ``:0`` and ``:0.0`` match, but no attempt
+    is made to resolve host names.
+    """
+    return bool(first) and strip_screen(first) == strip_screen(second)
+
+
+def send_commands(commands: Sequence[str], path: Optional[str]=None,
+                  timeout: float=10.0) -> Optional[List[Tuple[str, float]]]:
+    """Send commands to :mod:`quicktile.socket_api` in a single batch
+
+    :param commands: Command names as they'd be given on the command line.
+    :param path: The socket to connect to. Defaults to :func:`socket_path`.
+    :param timeout: How many seconds to wait for the daemon to respond.
+    :returns: A ``(status, milliseconds)`` pair for each command or
+        :any:`None` if no daemon was listening.
+    :raises ValueError: A command contained a line break or the daemon didn't
+        answer every command.
+    """
+    if any('\n' in x or '\r' in x for x in commands):
+        raise ValueError("Commands may not contain line breaks")
+
+    path = path or socket_path()
+    if not path:
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        try:
+            sock.connect(path)
+        except OSError:
+            return None
+
+        # Pipeline everything, then read until the daemon closes its end
+        sock.sendall(''.join(x + '\n' for x in commands).encode('utf8'))
+        sock.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        sock.close()
+
+    results = []
+    for line in b''.join(chunks).decode('utf8').splitlines():
+        status, elapsed, _ = line.split(' ', 2)
+        results.append((status, float(elapsed)))
+
+    # Anything else means the connection was dropped partway through
+    if len(results) != len(commands):
+        raise ValueError("Got %d responses for %d commands" % (
+            len(results), len(commands)))
+    return results
+
+
+def forward_commands(commands: Sequence[str]) -> Optional[List[bool]]:
+    """Ask a running ``quicktile --daemonize`` to execute some commands.
+
+    The control socket is preferred, with D-Bus as a fallback.
+
+    :param commands: Command names as they'd be given on the command line.
+        (``command@index`` syntax included)
+    :returns: Whether the daemon recognized and successfully ran each
+        command or :any:`None` if no daemon answered and the commands should
+        be run in-process instead.
+    """
+    try:
+        replies = send_commands(commands)
+    except (OSError, ValueError) as err:
+        # Some of the commands may have run, so don't retry in-process
+        logging.error("Error talking to the QuickTile control socket: %s",
+                      err)
+        return [False] * len(commands)
+    if replies is not None:
+        return [status == STATUS_OK for status, _ in replies]
+
+    try:
+        import dbus
+        from dbus.exceptions import DBusException
+    except ImportError:
+        logging.debug("dbus-python not available. Not looking for a daemon.")
+        return None
+
+    results = []  # type: List[bool]
+    try:
+        bus = dbus.SessionBus()
+        if not bus.name_has_owner(BUS_NAME):
+            return None
+
+        # The session bus may be shared by daemons on other X displays
+        # (eg. a nested Xephyr), so make sure we'd be talking to the right one
+        daemon = bus.get_object(BUS_NAME, OBJECT_PATH, introspect=False)
+        display = str(daemon.get_dbus_method('getDisplay', INTERFACE)())
+        if not same_display(display, os.environ.get('DISPLAY', '')):
+            logging.debug("Not forwarding to the QuickTile on display %r",
+                          display)
+            return None
+
+        do_command = daemon.get_dbus_method('doCommand', INTERFACE)
+        for command in commands:
+            results.append(bool(do_command(command)))
+    except DBusException as err:
+        if not results:
+            logging.debug("Could not reach a running QuickTile: %s", err)
+            return None
+
+        # Don't re-run the commands which already succeeded
+        logging.error("Lost contact with the running QuickTile: %s", err)
+        results += [False] * (len(commands) - len(results))
+    return results
+
+# vim: set sw=4 sts=4 expandtab :
@@ -14,28 +14,132 @@ __license__ = "GNU GPL 2.0 or later"
 import logging, time
 from functools import wraps
 
-from Xlib import Xatom
-
-import gi
-gi.require_version('Gdk', '3.0')
-gi.require_version('Wnck', '3.0')
-
-from gi.repository import Gdk, GdkX11, Wnck
-from gi.repository.Wnck import MotionDirection
-
+# GTK+ and Wnck are imported inside the commands which need them so that
+# listing commands and forwarding them to a daemon don't have to load them.
+# (By the time a command runs, :mod:`quicktile.wm` has required their versions)
 from .layout import resolve_fractional_geom, GravityLayout
-from .util import Rectangle, clamp_idx, fmt_table
+from .util import Rectangle, RectangleArray, clamp_idx, fmt_table
 
 # -- Type-Annotation Imports --
-from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+from typing import (TYPE_CHECKING, Any, Callable, Dict, FrozenSet, Iterable,
+                    Iterator, List, Optional, Tuple, Union)
 
-from .wm import WindowManager
 from .util import CommandCB, Gravity
 
+if TYPE_CHECKING:  # pragma: no cover
+    from gi.repository import Wnck  # NOQA pylint: disable=unused-import
+    from .wm import WindowManager  # NOQA pylint: disable=unused-import
+
 #: MyPy type alias for what gets stored in `CommandRegistry`
 CommandCBWrapper = Callable[..., Any]  # pylint: disable=invalid-name
+
+#: MyPy type alias for how `CommandRegistry` stores registration details
+#: (func, args, kwargs, static state, needs)
+CommandSpec = Tuple[CommandCB, Tuple[Any, ...], Dict[str, Any],
+                    Dict[str, Any], FrozenSet[str]]  # pylint: disable=C0103
 # --
 
+#: The context a command can ask :meth:`CommandRegistry.add` to gather for it
+#:
+#: ``window``
+#:     Resolve the active window and skip the command if there is no
+#:     relevant one.
+#: ``monitor``
+#:     Add ``monitor_id`` and ``monitor_geom`` to ``state``. (Implies
+#:     ``window`` and ``usable_region``)
+#: ``usable_region``
+#:     Refresh :attr:`quicktile.wm.WindowManager.usable_region` first.
+#: ``config``
+#:     Merge :attr:`CommandRegistry.extra_state` (eg. the parsed config
+#:     file) into ``state``.
+NEEDS_ALL = frozenset(('window', 'monitor', 'usable_region', 'config'))
+
+#: Inputs which must be requested explicitly because they change how a
+#: command is invoked.
+#:
+#: ``repeat``
+#:     Run once with the number of consecutive invocations in
+#:     ``state['repeat']`` (eg. when a key is held down) rather than being
+#:     run that many times.
+#: ``index``
+#:     Accept an explicit 0-based position in a sequence of presets via the
+#:     ``name@index`` syntax (eg. ``left@2``), provided in ``state['index']``.
+#:     The presets are the command's positional arguments (or, for stock
+#:     presets, the longest per-monitor list), so
+#:     :meth:`CommandRegistry.prepare` rejects indexes beyond them.
+NEEDS_OPTIONAL = frozenset(('repeat', 'index'))
+
+
+class PreparedCommand(object):  # pylint: disable=too-few-public-methods
+    """A command invocation resolved ahead of time
+
+    Holds the resolved callable, its fully merged arguments, and the static
+    portion of its ``state`` so that invoking it (eg. on a keypress) only has
+    to gather the facts about the target window.
+
+    Instances are created by :meth:`CommandRegistry.prepare`.
+    """
+    __slots__ = ('name', 'func', 'args', 'kwargs', 'state', 'needs',
+                 'registry')
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, registry: 'CommandRegistry', name: str,
+                 func: CommandCB, args: Tuple[Any, ...],
+                 kwargs: Dict[str, Any], state: Dict[str, Any],
+                 needs: FrozenSet[str]=NEEDS_ALL):
+        self.registry = registry
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.state = state
+        self.needs = needs
+
+    def __call__(self, winman: 'WindowManager', window: 'Wnck.Window'=None,
+                 repeat: int=1) -> None:
+        """Run the command
+
+        All X requests it makes are sent together once it finishes. (See
+        :meth:`WindowManager.transaction`)
+
+        :param winman: The window manager the command should act through.
+        :param window: The window to operate on. Defaults to the active window
+            if the command needs one.
+        :param repeat: How many consecutive times the command was invoked.
+        """
+        with winman.transaction():
+            if repeat > 1 and 'repeat' not in self.needs:
+                for _ in range(repeat):
+                    self._run(winman, window, 1)
+            else:
+                self._run(winman, window, repeat)
+
+    def _run(self, winman: 'WindowManager', window: Optional['Wnck.Window'],
+             repeat: int) -> None:
+        """Gather the context the command needs and then call it"""
+        needs = self.needs
+        logging.debug("Executing command '%s' with arguments %r, %r",
+                      self.name, self.args, self.kwargs)
+
+        # Workaround for #107 until I'm ready to solve it properly
+        # (Cheap once WindowManager.watch_struts is keeping struts current)
+        if 'usable_region' in needs:
+            winman.update_geometry_cache()
+
+        state = self.state.copy()
+        if 'repeat' in needs:
+            state['repeat'] = repeat
+
+        # Bail out early on None or things like the desktop window
+        if 'window' in needs:
+            window = window or winman.screen.get_active_window()
+            if not self.registry.get_window_meta(window, state, winman,
+                                                 'monitor' in needs):
+                logging.debug("No window and windowless=False")
+                return
+
+        self.func(winman, window, state, *self.args, **self.kwargs)
+
 
 class CommandRegistry(object):
     """Lookup and dispatch boilerplate for window management commands."""
@@ -47,6 +151,8 @@ class CommandRegistry(object):
         self.commands = {}  # type: Dict[str, CommandCBWrapper]
         self.help = {}      # type: Dict[str, str]
 
+        self._specs = {}  # type: Dict[str, CommandSpec]
+
     def __iter__(self) -> Iterator[str]:
         for name in self.commands:
             yield name
@@ -57,13 +163,16 @@ class CommandRegistry(object):
 
     @staticmethod
     def get_window_meta(
-            window: Wnck.Window, state: Dict[str, Any], winman: WindowManager
+            window: 'Wnck.Window', state: Dict[str, Any],
+            winman: 'WindowManager',
+            monitor: bool=True
     ) -> bool:
         """Gather information about ``window`` to pass to the command
 
         :param window: The window to inspect.
         :param state: The metadata dict to :meth:`dict.update` with gathered
             values.
+        :param monitor: Whether to look up the monitor ``window`` is on.
         :returns: A boolean indicating success or failure.
 
         .. todo:: Is the MPlayer safety hack in :meth:`get_window_meta` still
@@ -75,10 +184,13 @@ class CommandRegistry(object):
         if not winman.is_relevant(window):
             return False
 
-        win_rect = Rectangle(*window.get_geometry())
+        win_rect = Rectangle.from_xywh(*window.get_geometry())
         logging.debug("Operating on window %r with title \"%s\" "
                       "and geometry %r", window, window.get_name(), win_rect)
 
+        if not monitor:
+            return True
+
         monitor_id, monitor_geom = winman.get_monitor(window)
 
         # MPlayer safety hack
@@ -94,6 +206,24 @@ class CommandRegistry(object):
         })
         return True
 
+    @staticmethod
+    def _resolve_needs(needs: Iterable[str], windowless: bool=False
+                       ) -> FrozenSet[str]:
+        """Validate a ``needs`` declaration and add what it implies
+
+        :raises ValueError: ``needs`` contained an unrecognized input.
+        """
+        needs = frozenset(needs)
+        if not needs <= NEEDS_ALL | NEEDS_OPTIONAL:
+            raise ValueError("Unrecognized command inputs: %s" % ', '.join(
+                sorted(needs - NEEDS_ALL - NEEDS_OPTIONAL)))
+
+        if 'monitor' in needs:
+            needs |= {'window', 'usable_region'}
+        if windowless:
+            needs -= {'window', 'monitor'}
+        return needs
+
     def add(self, name: str, *p_args: Any, **p_kwargs: Any
             ) -> Callable[[CommandCB], CommandCB]:
         """Decorator to wrap a function in boilerplate and add it to the
@@ -108,7 +238,14 @@ class CommandRegistry(object):
             :param p_kwargs: Keyword arguments to prepend to all calls made
                 via ``name``.
             :param bool windowless: Allow the command to be invoked when no
-                relevant active window can be retrieved.
+                relevant active window can be retrieved. (Shorthand for
+                leaving ``window`` out of ``needs``)
+            :param bool replace: Replace any existing command with the same
+                name without warning. (eg. when reloading the configuration)
+            :param needs: Which of the inputs in :data:`NEEDS_ALL` the
+                command uses, so the rest can be skipped when it's called.
+                Defaults to all of them. May also include
+                :data:`NEEDS_OPTIONAL` inputs.
 
             :raises AssertionError: Raised if the wrapped function has no
                 docstring.
@@ -117,45 +254,32 @@ class CommandRegistry(object):
             .. todo:: Rethink the return value expected of command functions.
             """
 
+        # Separate the registration options from the command's arguments
+        kwargs = dict(p_kwargs)
+        needs = self._resolve_needs(kwargs.pop('needs', NEEDS_ALL),
+                                    kwargs.pop('windowless', False))
+        replace = kwargs.pop('replace', False)
+        state = {'cmd_name': name}  # type: Dict[str, Any]
+        if 'cmd_idx' in kwargs:
+            state['cmd_idx'] = kwargs.pop('cmd_idx')
+
         def decorate(func: CommandCB) -> CommandCB:
             """Closure used to allow decorator to take arguments"""
             @wraps(func)
             # pylint: disable=missing-docstring
-            def wrapper(winman: WindowManager,
-                        window: Wnck.Window=None,
+            def wrapper(winman: 'WindowManager',
+                        window: 'Wnck.Window'=None,
                         *args,
                         **kwargs
                         ) -> None:
+                prepared = self.prepare(name, *args, **kwargs)
+                if prepared:
+                    prepared(winman, window)
 
-                window = window or winman.screen.get_active_window()
-
-                state = {}
-                state.update(self.extra_state)
-                state["cmd_name"] = name
-
-                # FIXME: Refactor to avoid this hack
-                windowless = p_kwargs.get('windowless', False)
-                if 'windowless' in p_kwargs:
-                    del p_kwargs['windowless']
-
-                # Bail out early on None or things like the desktop window
-                if not (windowless or self.get_window_meta(
-                        window, state, winman)):
-                    logging.debug("No window and windowless=False")
-                    return None
-
-                args, kwargs = p_args + args, dict(p_kwargs, **kwargs)
-
-                # TODO: Factor out this hack
-                if 'cmd_idx' in kwargs:
-                    state['cmd_idx'] = kwargs['cmd_idx']
-                    del kwargs['cmd_idx']
-
-                func(winman, window, state, *args, **kwargs)
-
-            if name in self.commands:
+            if name in self.commands and not replace:
                 logging.warning("Redefining existing command: %s", name)
             self.commands[name] = wrapper
+            self._specs[name] = (func, p_args, kwargs, state, needs)
 
             if not func.__doc__:
                 raise AssertionError("All commands must have a docstring: "
@@ -169,7 +293,7 @@ class CommandRegistry(object):
             return func
         return decorate
 
-    def add_many(self, command_map: Dict[str, List[Any]]
+    def add_many(self, command_map: Dict[str, List[Any]], **p_kwargs: Any
                  ) -> Callable[[CommandCB], CommandCB]:
         """Convenience decorator to call :meth:`add` repeatedly to assing
            multiple command names to the same function which differ only in
@@ -177,6 +301,8 @@ class CommandRegistry(object):
 
            :param command_map: A dict mapping command names to lists of
                 arguments.
+           :param p_kwargs: Keyword arguments to pass to every :meth:`add`
+                call. (eg. ``needs``)
 
            .. todo:: Refactor and redesign :meth:`add_many` for better
               maintainability.
@@ -185,13 +311,77 @@ class CommandRegistry(object):
         def decorate(func):
             """Closure used to allow decorator to take arguments"""
             for pos, (cmd, arglist) in enumerate(command_map.items()):
-                self.add(cmd, cmd_idx=pos, *arglist)(func)
+                self.add(cmd, cmd_idx=pos, *arglist, **p_kwargs)(func)
             return func
         return decorate
 
+    def prepare(self, command: str, *args: Any, **kwargs: Any
+                ) -> Optional[PreparedCommand]:
+        """Resolve a command name and its arguments ahead of time.
+
+        The result can be stored (eg. in a keybinding) and called repeatedly
+        with a :class:`quicktile.wm.WindowManager` to run the command without
+        repeating the lookup and argument merging.
+
+        :param command: The name of the command to prepare, optionally
+            followed by ``@`` and an index for commands which accept one.
+        :param args: Positional arguments to append to those it was registered
+            with.
+        :param kwargs: Keyword arguments to merge over those it was
+            registered with.
+        :returns: The prepared invocation or :any:`None` if the command name
+            was not recognized or was given an invalid index.
+
+        .. note:: :attr:`extra_state` is merged in at this point, so
+            invocations must be re-prepared if it changes.
+        """
+        index = None  # type: Optional[int]
+        if '@' in command:
+            command, _, index_str = command.rpartition('@')
+            try:
+                index = int(index_str)
+            except ValueError:
+                logging.error("Invalid index for command %s: %r",
+                              command, index_str)
+                return None
+
+        spec = self._specs.get(command, None)
+        if not spec:
+            return None
+        func, p_args, p_kwargs, p_state, needs = spec
+
+        state = dict(self.extra_state) if 'config' in needs else {}
+        state.update(p_state)
+
+        if index is not None:
+            if 'index' not in needs:
+                logging.error("Command %s does not accept an index", command)
+                return None
+
+            # Reject it now so callers (eg. D-Bus) hear about the failure.
+            # (Stock presets can have more entries on other monitors, so
+            # accept anything valid on at least one of them.)
+            count = len(p_args) + len(args)
+            table = state.get('presets')
+            if table and list(p_args + args) == table.default_layout.get(
+                    command):
+                count = max(count, table.max_presets(command))
+            if not 0 <= index < count:
+                logging.error("Index %d is out of range for %s (0 to %d)",
+                              index, command, count - 1)
+                return None
+            state['index'] = index
+
+        kwargs = dict(p_kwargs, **kwargs)
+        if 'cmd_idx' in kwargs:
+            state['cmd_idx'] = kwargs.pop('cmd_idx')
+
+        return PreparedCommand(self, command, func, p_args + args, kwargs,
+                               state, needs)
+
     def call(self,
             command: str,
-            winman: WindowManager,
+            winman: 'WindowManager',
             *args: Any,
             **kwargs: Any) -> bool:
         """Look up a registered command by name and execute it.
@@ -202,38 +392,40 @@ class CommandRegistry(object):
 
         .. todo:: Allow commands to report success or failure
         """
-        cmd = self.commands.get(command, None)
-
-        if cmd:
-            logging.debug("Executing command '%s' with arguments %r, %r",
-                          command, args, kwargs)
-
-            # Workaround for #107 until I'm ready to solve it properly
-            winman.update_geometry_cache()
-
-            cmd(winman, *args, **kwargs)
+        prepared = self.prepare(command, *args, **kwargs)
 
+        if prepared:
+            prepared(winman)
             return True
-        else:
+        elif command.partition('@')[0] not in self._specs:
             logging.error("Unrecognized command: %s", command)
-            return False
+        return False
 
 
 #: The instance of :class:`CommandRegistry` to be used in 99.9% of use cases.
 commands = CommandRegistry()
 
 
-def cycle_dimensions(winman: WindowManager,
-                     win: Wnck.Window,
+def cycle_dimensions(winman: 'WindowManager',
+                     win: 'Wnck.Window',
                      state: Dict[str, Any],
                      *dimensions: Optional[Tuple[float, float, float, float]]
                      ) -> Optional[Rectangle]:
     """Cycle the active window through a list of positions and shapes.
 
-    Takes one step each time this function is called.
+    Takes one step each time this function is called. (Or ``state['repeat']``
+    steps, if present, to skip over intermediate shapes when a key is held.)
+
+    If ``state['index']`` is present, it jumps directly to that 0-based
+    position in the sequence instead.
 
-    Keeps track of its position by storing the index in an X11 property on
-    ``win`` named ``_QUICKTILE_CYCLE_POS``.
+    Keeps track of its position via :meth:`WindowManager.get_cycle_pos` and
+    :meth:`WindowManager.set_cycle_pos`, which store the index in an X11
+    property on ``win`` named ``_QUICKTILE_CYCLE_POS``.
+
+    If ``state`` contains a :class:`quicktile.layout.PresetTable` under
+    ``presets`` and ``dimensions`` are the stock presets for the command, the
+    table's precompiled rectangles for the window's monitor are used instead.
 
     :param dimensions: A list of tuples representing window geometries as
         floating-point values between 0 and 1, inclusive.
@@ -245,51 +437,80 @@ def cycle_dimensions(winman: WindowManager,
         :func:`cycle_dimensions` with a custom type.
     """
     monitor_rect = state['monitor_geom']
-    win_rect_rel = Rectangle(*win.get_geometry()).to_relative(monitor_rect)
 
     logging.debug("Selected preset sequence:\n\t%r", dimensions)
 
-    # Resolve proportional (eg. 0.5) and preserved (None) coordinates
-    dims = [resolve_fractional_geom(i or win_rect_rel, monitor_rect)
-        for i in dimensions]
-    if not dims:
-        return None
+    # Use the precompiled pixel rectangles if these are the stock presets
+    compiled = None  # type: Optional[List[Optional[Rectangle]]]
+    table = state.get('presets')
+    if table and list(dimensions) == table.default_layout.get(
+            state.get('cmd_name')):
+        compiled = table.get(winman.usable_region,
+                             state.get('monitor_id', 0), state['cmd_name'])
 
-    logging.debug("Selected preset sequence resolves to these monitor-relative"
-                  " pixel dimensions:\n\t%r", dims)
+    if compiled is not None:
+        count = len(compiled)
+    else:
+        win_rect_rel = Rectangle.from_xywh(*win.get_geometry()).to_relative(
+            monitor_rect)
 
-    try:
-        cmd_idx, pos = winman.get_property(win, '_QUICKTILE_CYCLE_POS',
-                                           Xatom.INTEGER)
-        logging.debug("Got saved cycle position: %r, %r", cmd_idx, pos)
-    except (ValueError, TypeError):  # TODO: Is TypeError still possible?
-        logging.debug("Restarting cycle position sequence")
-        cmd_idx, pos = None, -1
+        # Resolve proportional (eg. 0.5) and preserved (None) coordinates
+        dims = [resolve_fractional_geom(i or win_rect_rel, monitor_rect)
+            for i in dimensions]
+        count = len(dims)
 
-    if cmd_idx == state.get('cmd_idx', 0):
-        pos = (pos + 1) % len(dims)
-    else:
-        pos = 0
+        logging.debug("Selected preset sequence resolves to these "
+                      "monitor-relative pixel dimensions:\n\t%r", dims)
+
+    if not count:
+        return None
 
-    winman.set_property(win, '_QUICKTILE_CYCLE_POS',
-        [int(state.get('cmd_idx', 0)), pos],
-        prop_type=Xatom.INTEGER, format_size=32)
+    if 'index' in state:
+        # Jump straight to the requested position (no need to read the old)
+        pos = state['index']
+        if not 0 <= pos < count:
+            logging.error("Index %d is out of range for %s (0 to %d)",
+                          pos, state.get('cmd_name'), count - 1)
+            return None
+    else:
+        saved = winman.get_cycle_pos(win)
+        if saved:
+            cmd_idx, pos = saved
+            logging.debug("Got saved cycle position: %r, %r", cmd_idx, pos)
+        else:
+            logging.debug("Restarting cycle position sequence")
+            cmd_idx, pos = None, -1
 
-    result = None  # type: Optional[Rectangle]
-    result = Rectangle(*dims[pos]).from_relative(monitor_rect)
+        # Take as many steps as there were consecutive invocations
+        steps = state.get('repeat', 1)
+        if cmd_idx == state.get('cmd_idx', 0):
+            pos = (pos + steps) % count
+        else:
+            pos = (steps - 1) % count
 
-    logging.debug("Target preset is %s relative to monitor %s",
-                  result, monitor_rect)
+    winman.set_cycle_pos(win, int(state.get('cmd_idx', 0)), pos)
 
-    # If we're overlapping a panel, fall back to a monitor-specific
-    # analogue to _NET_WORKAREA to prevent overlapping any panels and
-    # risking the WM potentially meddling with the result of resposition()
-    test_result = winman.usable_region.clip_to_usable_region(result)
-    if test_result != result:
-        result = test_result
-        logging.debug("Result exceeds usable (non-rectangular) region of "
-                      "desktop. (overlapped a non-fullwidth panel?) Reducing "
-                      "to within largest usable rectangle: %s", test_result)
+    result = None  # type: Optional[Rectangle]
+    if compiled is not None:
+        result = compiled[pos]
+        logging.debug("Target preset is %s (precompiled for monitor %s)",
+                      result, monitor_rect)
+    else:
+        result = dims[pos].from_relative(monitor_rect)
+
+        logging.debug("Target preset is %s relative to monitor %s",
+                      result, monitor_rect)
+
+        # If we're overlapping a panel, fall back to a monitor-specific
+        # analogue to _NET_WORKAREA to prevent overlapping any panels and
+        # risking the WM potentially meddling with the result of resposition()
+        test_result = winman.usable_region.clip_to_usable_region(result)
+        if test_result != result:
+            result = test_result
+            logging.debug("Result exceeds usable (non-rectangular) region of "
+                          "desktop. (overlapped a non-fullwidth panel?) "
+                          "Reducing to within largest usable rectangle: %s",
+                          test_result)
 
     logging.debug("Calling reposition() with default gravity and dimensions "
                   "%r", result)
@@ -297,11 +518,11 @@ def cycle_dimensions(winman: WindowManager,
     return result
 
 
-@commands.add('monitor-switch', force_wrap=True)
-@commands.add('monitor-next', 1)
-@commands.add('monitor-prev', -1)
-def cycle_monitors(winman: WindowManager,  # pylint: disable=too-many-arguments
-                   win: Wnck.Window,
+@commands.add('monitor-switch', force_wrap=True, needs=NEEDS_ALL | {'repeat'})
+@commands.add('monitor-next', 1, needs=NEEDS_ALL | {'repeat'})
+@commands.add('monitor-prev', -1, needs=NEEDS_ALL | {'repeat'})
+def cycle_monitors(winman: 'WindowManager',  # pylint: disable=R0913
+                   win: 'Wnck.Window',
                    state: Dict[str, Any],
                    step: int=1,
                    force_wrap: bool=False,
@@ -313,37 +534,43 @@ def cycle_monitors(winman: WindowManager,  # pylint: disable=too-many-arguments
     get placed outside the available space on the target monitor.
 
     :param win: The window to operate on.
-    :param step: How many monitors to step forward or backward.
+    :param step: How many monitors to step forward or backward. (Multiplied by
+        ``state['repeat']`` if present.)
     :param force_wrap: If :any`True`, this will override setting
         :ref:`MovementsWrap <MovementsWrap>` to :any:`False`.
     """
+    monitors = winman.usable_region.monitors
     old_mon_id, _ = winman.get_monitor(win)
-    n_monitors = n_monitors or winman.gdk_screen.get_n_monitors()
+    n_monitors = n_monitors or len(monitors)
     do_wrapping = (state['config'].getboolean('general', 'MovementsWrap') or
                    force_wrap)
 
-    new_mon_id = clamp_idx(old_mon_id + step, n_monitors, do_wrapping)
-    new_mon_geom = Rectangle.from_gdk(
-        winman.gdk_screen.get_monitor_geometry(new_mon_id))
+    new_mon_id = clamp_idx(old_mon_id + step * state.get('repeat', 1),
+                           n_monitors, do_wrapping)
+    new_mon_geom = monitors[new_mon_id]
     logging.debug("Moving window to monitor %s, which has geometry %s",
                   new_mon_id, new_mon_geom)
 
     winman.reposition(win, None, new_mon_geom, keep_maximize=True)
 
 
-@commands.add('monitor-switch-all', force_wrap=True)
-@commands.add('monitor-prev-all', -1)
-@commands.add('monitor-next-all', 1)
+@commands.add('monitor-switch-all', force_wrap=True,
+              needs=('window', 'usable_region', 'config', 'repeat'))
+@commands.add('monitor-prev-all', -1,
+              needs=('window', 'usable_region', 'config', 'repeat'))
+@commands.add('monitor-next-all', 1,
+              needs=('window', 'usable_region', 'config', 'repeat'))
 def cycle_monitors_all(
-        winman: WindowManager,
-        win: Wnck.Window,
+        winman: 'WindowManager',
+        win: 'Wnck.Window',
         state: Dict[str, Any],
         step: int=1,
         force_wrap: bool=False
 ) -> None:
     """Cycle all windows between monitors.
 
-    (Apply :func:`cycle_monitors` to all windows.)
+    (Apply :func:`cycle_monitors` to all windows, but as a single batch via
+    :meth:`WindowManager.reposition_many`.)
 
     Attempts to preserve each window's position but will ensure that it doesn't
     get placed outside the available space on the target monitor.
@@ -355,21 +582,33 @@ def cycle_monitors_all(
     # Have to specify types in the description pending a fix for
     # https://github.com/agronholm/sphinx-autodoc-typehints/issues/124
 
-    n_monitors = winman.gdk_screen.get_n_monitors()
+    monitors = winman.usable_region.monitors
     curr_workspace = win.get_workspace()
 
     if not curr_workspace:
         logging.debug("get_workspace() returned None")
         return
 
-    for window in winman.get_relevant_windows(curr_workspace):
-        cycle_monitors(winman, window, state, step, force_wrap, n_monitors)
+    do_wrapping = (state['config'].getboolean('general', 'MovementsWrap') or
+                   force_wrap)
+    step *= state.get('repeat', 1)
+
+    windows = list(winman.get_relevant_windows(curr_workspace))
+    old_monitors = winman.usable_region.find_monitor_ids_for(RectangleArray(
+        Rectangle.from_xywh(*window.get_geometry()) for window in windows))
+
+    targets = []
+    for window, (old_mon_id, _) in zip(windows, old_monitors):
+        new_mon_id = clamp_idx(old_mon_id + step, len(monitors), do_wrapping)
+        targets.append((window, monitors[new_mon_id]))
+
+    winman.reposition_many(targets, keep_maximize=True)
 
 
 @commands.add_many({'move-to-{}'.format(name): [variant]
     for name, variant in GravityLayout.GRAVITIES.items()})
-def move_to_position(winman: WindowManager,
-                     win: Wnck.Window,
+def move_to_position(winman: 'WindowManager',
+                     win: 'Wnck.Window',
                      state: Dict[str, Any],
                      gravity: Gravity,
                      ) -> None:
@@ -379,7 +618,7 @@ def move_to_position(winman: WindowManager,
     :param win: The window to operate on.
     """
     monitor_rect = state['monitor_geom']
-    win_rect = Rectangle(*win.get_geometry())
+    win_rect = Rectangle.from_xywh(*win.get_geometry())
 
     # Build a target rectangle
     # TODO: Think about ways to refactor scaling for better maintainability
@@ -395,6 +634,8 @@ def move_to_position(winman: WindowManager,
                   target, winman.usable_region)
     confined_target = winman.usable_region.move_to_usable_region(target)
 
+    from gi.repository import Wnck
+
     # Actually reposition the window
     # (and be doubly-sure we're not going to resize it by accident)
     logging.debug("Calling reposition() with dimensions %r", confined_target)
@@ -403,10 +644,10 @@ def move_to_position(winman: WindowManager,
                       Wnck.WindowMoveResizeMask.Y)
 
 
-@commands.add('bordered')
+@commands.add('bordered', needs=('window',))
 def toggle_decorated(
-    winman: WindowManager,
-    win: Wnck.Window,
+    winman: 'WindowManager',
+    win: 'Wnck.Window',
     state: Dict[str, Any]  # pylint: disable=unused-argument
 ) -> None:
     """Toggle window decoration state on the active window.
@@ -417,17 +658,19 @@ def toggle_decorated(
     # Have to specify types in the description pending a fix for
     # https://github.com/agronholm/sphinx-autodoc-typehints/issues/124
 
+    from gi.repository import Gdk, GdkX11
+
     # TODO: Switch to setting this via python-xlib
-    display = winman.gdk_screen.get_display()
-    win = GdkX11.X11Window.foreign_new_for_display(display, win.get_xid())
+    win = GdkX11.X11Window.foreign_new_for_display(
+        winman.gdk_display, win.get_xid())
     win.set_decorations(Gdk.WMDecoration(0) if win.get_decorations()[1]
         else Gdk.WMDecoration.ALL)
 
 
-@commands.add('show-desktop', windowless=True)
+@commands.add('show-desktop', needs=())
 def toggle_desktop(
-        winman: WindowManager,
-        win: Wnck.Window,      # pylint: disable=unused-argument
+        winman: 'WindowManager',
+        win: 'Wnck.Window',    # pylint: disable=unused-argument
         state: Dict[str, Any]  # pylint: disable=unused-argument
 ) -> None:
     """Toggle "all windows minimized" to view the desktop.
@@ -440,21 +683,22 @@ def toggle_desktop(
     winman.screen.toggle_showing_desktop(target)
 
 
-@commands.add('all-desktops', 'pin', 'is_pinned')
-@commands.add('fullscreen', 'set_fullscreen', 'is_fullscreen', True)
+@commands.add('all-desktops', 'pin', 'is_pinned', needs=('window',))
+@commands.add('fullscreen', 'set_fullscreen', 'is_fullscreen', True,
+              needs=('window',))
 @commands.add('vertical-maximize', 'maximize_vertically',
-                                   'is_maximized_vertically')
+              'is_maximized_vertically', needs=('window',))
 @commands.add('horizontal-maximize', 'maximize_horizontally',
-                                     'is_maximized_horizontally')
-@commands.add('maximize', 'maximize', 'is_maximized')
-@commands.add('minimize', 'minimize', 'is_minimized')
-@commands.add('always-above', 'make_above', 'is_above')
-@commands.add('always-below', 'make_below', 'is_below')
-@commands.add('shade', 'shade', 'is_shaded')
+              'is_maximized_horizontally', needs=('window',))
+@commands.add('maximize', 'maximize', 'is_maximized', needs=('window',))
+@commands.add('minimize', 'minimize', 'is_minimized', needs=('window',))
+@commands.add('always-above', 'make_above', 'is_above', needs=('window',))
+@commands.add('always-below', 'make_below', 'is_below', needs=('window',))
+@commands.add('shade', 'shade', 'is_shaded', needs=('window',))
 # pylint: disable=too-many-arguments
 def toggle_state(
-        winman: WindowManager,  # pylint: disable=unused-argument
-        win: Wnck.Window,
+        winman: 'WindowManager',  # pylint: disable=unused-argument
+        win: 'Wnck.Window',
         state: Dict[str, Any],  # pylint: disable=unused-argument
         command: str,
         check: str,
@@ -488,11 +732,11 @@ def toggle_state(
         getattr(win, ('' if target else 'un') + command)()
 
 
-@commands.add('trigger-move', 'move')
-@commands.add('trigger-resize', 'size')
+@commands.add('trigger-move', 'move', needs=('window',))
+@commands.add('trigger-resize', 'size', needs=('window',))
 def trigger_keyboard_action(
-        winman: WindowManager,  # pylint: disable=unused-argument
-        win: Wnck.Window,
+        winman: 'WindowManager',  # pylint: disable=unused-argument
+        win: 'Wnck.Window',
         state: Dict[str, Any],  # pylint: disable=unused-argument
         command: str) -> None:
     """Ask the Window Manager to begin a keyboard-driven operation.
@@ -507,17 +751,17 @@ def trigger_keyboard_action(
     getattr(win, 'keyboard_' + command)()
 
 
-@commands.add('workspace-go-next', 1, windowless=True)
-@commands.add('workspace-go-prev', -1, windowless=True)
-@commands.add('workspace-go-up', MotionDirection.UP, windowless=True)
-@commands.add('workspace-go-down', MotionDirection.DOWN, windowless=True)
-@commands.add('workspace-go-left', MotionDirection.LEFT, windowless=True)
-@commands.add('workspace-go-right', MotionDirection.RIGHT, windowless=True)
+@commands.add('workspace-go-next', 1, needs=('config',))
+@commands.add('workspace-go-prev', -1, needs=('config',))
+@commands.add('workspace-go-up', 'UP', needs=('config',))
+@commands.add('workspace-go-down', 'DOWN', needs=('config',))
+@commands.add('workspace-go-left', 'LEFT', needs=('config',))
+@commands.add('workspace-go-right', 'RIGHT', needs=('config',))
 def workspace_go(
-        winman: WindowManager,
-        win: Optional[Wnck.Window],  # pylint: disable=unused-argument
+        winman: 'WindowManager',
+        win: Optional['Wnck.Window'],  # pylint: disable=unused-argument
         state: Dict[str, Any],
-        motion: MotionDirection) -> None:
+        motion: Union[str, int]) -> None:
     """Switch the active workspace.
 
     (Integer values for ``motion`` may cause wrap-around behaviour depending
@@ -526,8 +770,8 @@ def workspace_go(
     :param state: Used to access the :ref:`MovementsWrap <MovementsWrap>`
         configuration key.
     :param motion: The direction to move the window on the workspace grid or
-        the distance to move it by numerical ordering. Accepts
-        :class:`Wnck.MotionDirection` or :any:`int`.
+        the distance to move it by numerical ordering. Accepts the name of a
+        :class:`Wnck.MotionDirection` member or :any:`int`.
     :param win: Unused but required by the command API.
     """
     # Have to specify types in the description pending a fix for
@@ -544,17 +788,17 @@ def workspace_go(
     target.activate(int(time.time()))
 
 
-@commands.add('workspace-send-next', 1)
-@commands.add('workspace-send-prev', -1)
-@commands.add('workspace-send-up', MotionDirection.UP)
-@commands.add('workspace-send-down', MotionDirection.DOWN)
-@commands.add('workspace-send-left', MotionDirection.LEFT)
-@commands.add('workspace-send-right', MotionDirection.RIGHT)
+@commands.add('workspace-send-next', 1, needs=('window', 'config'))
+@commands.add('workspace-send-prev', -1, needs=('window', 'config'))
+@commands.add('workspace-send-up', 'UP', needs=('window', 'config'))
+@commands.add('workspace-send-down', 'DOWN', needs=('window', 'config'))
+@commands.add('workspace-send-left', 'LEFT', needs=('window', 'config'))
+@commands.add('workspace-send-right', 'RIGHT', needs=('window', 'config'))
 def workspace_send_window(
-        winman: WindowManager,
-        win: Wnck.Window,
+        winman: 'WindowManager',
+        win: 'Wnck.Window',
         state: Dict[str, Any],
-        motion: Union[MotionDirection, int]) -> None:
+        motion: Union[str, int]) -> None:
     """Move the active window to another workspace.
 
     (Integer values for ``motion`` may cause wrap-around behaviour depending
@@ -563,8 +807,8 @@ def workspace_send_window(
     :param state: Used to access the :ref:`MovementsWrap <MovementsWrap>`
         configuration key.
     :param motion: The direction to move the window on the workspace grid or
-        the distance to move it by numerical ordering. Accepts
-        :class:`Wnck.MotionDirection` or :any:`int`.
+        the distance to move it by numerical ordering. Accepts the name of a
+        :class:`Wnck.MotionDirection` member or :any:`int`.
     :param win: The window to operate on.
     """
     # Have to specify types in the description pending a fix for
@@ -13,6 +13,8 @@ from dbus import SessionBus
 from dbus.exceptions import DBusException
 from dbus.mainloop.glib import DBusGMainLoop
 
+from .client import BUS_NAME, INTERFACE, OBJECT_PATH
+
 # -- Type-Annotation Imports --
 from typing import Optional, Tuple
 from .commands import CommandRegistry
@@ -30,11 +32,11 @@ class QuickTile(Object):
             bus: SessionBus,
             commands: CommandRegistry,
             winman: WindowManager) -> None:
-        Object.__init__(self, bus, '/com/ssokolow/QuickTile')
+        Object.__init__(self, bus, OBJECT_PATH)
         self.commands = commands
         self.winman = winman
 
-    @method(dbus_interface='com.ssokolow.QuickTile',
+    @method(dbus_interface=INTERFACE,
             in_signature='s', out_signature='b')
     def doCommand(self, command):  # type: (str) -> bool
         """Execute a QuickTile tiling command
@@ -48,6 +50,34 @@ class QuickTile(Object):
         """
         return self.commands.call(command, self.winman)
 
+    @method(dbus_interface=INTERFACE,
+            in_signature='si', out_signature='b')
+    def doCommandAtIndex(self, command, index):  # type: (str, int) -> bool
+        """Execute a QuickTile tiling command at a specific position in its
+        cycle of shapes
+
+        (Equivalent to calling :meth:`doCommand` with ``command@index``)
+
+        :param command: The name of the command to attempt to run.
+        :param index: The 0-based position to jump to.
+        :returns: Whether ``command`` was found in the registry and accepted
+            ``index``.
+        """
+        return self.commands.call('%s@%d' % (command, index), self.winman)
+
+    @method(dbus_interface=INTERFACE,
+            in_signature='', out_signature='s')
+    def getDisplay(self):  # type: () -> str
+        """Identify the X display this QuickTile is managing
+
+        Used by :func:`quicktile.client.forward_commands` so command-line
+        invocations on other displays sharing the session bus don't act on
+        this one.
+
+        :returns: The display name (eg. ``:0``)
+        """
+        return self.winman.x_display.get_display_name()
+
 
 def init(commands: CommandRegistry,
          winman: WindowManager,
@@ -63,7 +93,7 @@ def init(commands: CommandRegistry,
         logging.warning("Could not connect to the D-Bus Session Bus.")
         return None
 
-    dbus_name = BusName("com.ssokolow.QuickTile", sess_bus)
+    dbus_name = BusName(BUS_NAME, sess_bus)
     dbus_obj = QuickTile(sess_bus, commands, winman)
 
     return dbus_name, dbus_obj
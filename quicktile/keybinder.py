@@ -8,7 +8,7 @@ __license__ = "GNU GPL 2.0 or later"
 # pylint: disable=unsubscriptable-object,wrong-import-order
 
 import logging
-from functools import reduce  # pylint: disable=redefined-builtin
+from functools import partial, reduce  # pylint: disable=redefined-builtin
 
 import gi
 gi.require_version('Gtk', '3.0')
@@ -25,7 +25,8 @@ from typing import (Any, Callable, Dict, Iterable, Iterator, Optional, Tuple,
                     Union)
 
 # Used only in type comments
-from typing import List  # NOQA pylint: disable=unused-import
+from typing import List, Set  # NOQA pylint: disable=unused-import
+from .commands import PreparedCommand  # NOQA pylint: disable=unused-import
 
 from Xlib.error import XError
 from Xlib.protocol.event import KeyPress as XKeyPress
@@ -69,6 +70,8 @@ class KeyBinder(object):
 
         self.xroot = self.xdisp.screen().root
         self._keys = {}  # type: Dict[Tuple[int, int], Callable]
+        self._repeatable = set()  # type: Set[Tuple[int, int]]
+        self._xevent_handlers = []  # type: List[Callable[[Any], None]]
 
         # Resolve these at runtime to avoid NameErrors
         self._ignored_modifiers = [getattr(X, name) for name in
@@ -85,12 +88,16 @@ class KeyBinder(object):
         GLib.io_add_watch(self.xroot.display, GLib.PRIORITY_DEFAULT,
                          GLib.IO_IN, self.cb_xevent)
 
-    def bind(self, accel: str, callback: Callable[[], None]) -> bool:
+    def bind(self, accel: str, callback: Callable[..., None],
+             repeatable: bool=False) -> bool:
         """Bind a global key combination to a callback.
 
         :param accel: An accelerator as either a string to be parsed by
             :func:`Gtk.accelerator_parse` or a tuple as returned by it.)
         :param callback: The function to call when the key is pressed.
+        :param repeatable: If :any:`True`, ``callback`` accepts a ``repeat``
+            keyword argument and a burst of presses will be passed to it as a
+            single call with the count rather than as multiple calls.
 
         :returns: A boolean indicating whether the provided keybinding was
             parsed successfully and didn't provoke an error from XGrabKey_.
@@ -104,12 +111,19 @@ class KeyBinder(object):
             return False
 
         # Ignore modifiers like Mod2 (NumLock) and Lock (CapsLock)
-        self._keys[(keycode, 0)] = callback  # Null modifiers seem to be a risk
+        keysigs = [(keycode, 0)]  # Null modifiers seem to be a risk
         for mmask in self._vary_modmask(modmask, self._ignored_modifiers):
-            self._keys[(keycode, mmask)] = callback
+            keysigs.append((keycode, mmask))
             self.xroot.grab_key(keycode, mmask,
                                 1, X.GrabModeAsync, X.GrabModeAsync)
 
+        for keysig in keysigs:
+            self._keys[keysig] = callback
+            if repeatable:
+                self._repeatable.add(keysig)
+            else:
+                self._repeatable.discard(keysig)
+
         # If we don't do this, then nothing works.
         # I assume it flushes the XGrabKey calls to the server.
         self.xdisp.sync()
@@ -123,6 +137,42 @@ class KeyBinder(object):
 
         return True
 
+    def unbind(self, accel: str) -> bool:
+        """Release a key combination bound by :meth:`bind`.
+
+        :param accel: The accelerator it was bound with.
+        :returns: A boolean indicating whether the accelerator could be
+            parsed.
+        """
+        parsed = self.parse_accel(accel)
+        if parsed:
+            keycode, modmask = parsed
+        else:
+            return False
+
+        # Leave the null modifier entry alone if another binding owns it
+        if self._keys.get((keycode, 0)) is self._keys.get((keycode, modmask)):
+            self._keys.pop((keycode, 0), None)
+
+        for mmask in self._vary_modmask(modmask, self._ignored_modifiers):
+            self.xroot.ungrab_key(keycode, mmask)
+            self._keys.pop((keycode, mmask), None)
+            self._repeatable.discard((keycode, mmask))
+        return True
+
+    def add_xevent_handler(self, callback: Callable[[Any], None]):
+        """Register a callback to receive the X events which aren't
+        keypresses.
+
+        Since only one GLib watch can drain the event queue on a given X
+        connection, this allows other code sharing :attr:`xdisp` (eg.
+        :meth:`quicktile.wm.WindowManager.handle_xevent`) to see the events
+        it asked for.
+
+        :param callback: A function which will be called with each event.
+        """
+        self._xevent_handlers.append(callback)
+
     def cb_xerror(self, err: XError, request: Any):
         """Callback used to identify when attempts to bind keys fail.
 
@@ -156,45 +206,72 @@ class KeyBinder(object):
             signature once it's no longer necessary to support Python
             versions prior to 3.8.
         .. todo:: Move :meth:`cb_xevent` out of keybinder into the core since
-            Xlib is no longer optional and dispatch should be shared with
-            :mod:`quicktile.wm` for responding to panel reservation changes.
+            Xlib is no longer optional. (Dispatch is currently shared with
+            :mod:`quicktile.wm` via :meth:`add_xevent_handler`.)
         """
         handle = handle or self.xroot.display
 
+        # Collapse runs of the same keybind (eg. from holding the key down or
+        # hammering it faster than we can keep up) into a single dispatch so
+        # commands can skip straight to the end result.
+        #
+        # (python-xlib has no XKB bindings for detectable auto-repeat, but
+        #  whatever piled up in the queue since the last wakeup is exactly
+        #  the backlog we'd otherwise be flickering through.)
+        pending, repeat = None, 0  # type: Optional[XKeyPress], int
         for _ in range(0, handle.pending_events()):
             xevent = handle.next_event()
             if xevent.type == X.KeyPress:
-                self.handle_keypress(xevent)
+                if pending and (xevent.detail, xevent.state) == (
+                        pending.detail, pending.state):
+                    repeat += 1
+                    continue
+                elif pending:
+                    self.handle_keypress(pending, repeat)
+                pending, repeat = xevent, 1
+            else:
+                for handler in self._xevent_handlers:
+                    handler(xevent)
+
+        if pending:
+            self.handle_keypress(pending, repeat)
 
         # Necessary for proper function
         return True
 
-    def handle_keypress(self, xevent: XKeyPress):
+    def handle_keypress(self, xevent: XKeyPress, repeat: int=1):
         """Resolve :class:`Xlib.protocol.event.KeyPress` events to the
         :class:`quicktile.commands.CommandRegistry` commands associated with
         them and then call the commands.
 
+        :param xevent: The keypress to handle.
+        :param repeat: How many consecutive times it was pressed.
+
 
         .. todo:: Use a proper ``index`` argument for
             :meth:`Xlib.display.Display.keycode_to_keysym` in
             :meth:`handle_keypress`'s debug messaging.
-        .. todo:: Only call the code to look up a human-readable name for a
-            key event if the log level is high enough that it won't be wasted.
         """
         keysig = (xevent.detail, xevent.state)
-        if keysig not in self._keys:
+        callback = self._keys.get(keysig)
+        if callback is None:
             logging.error("Received an event for an unrecognized keybind: "
                           "%s, %s", xevent.detail, xevent.state)
             return
 
-        # Display a meaningful debug message
-        ksym = self.xdisp.keycode_to_keysym(keysig[0], 0)
-        gmod = Gdk.ModifierType(keysig[1])
-        kbstr = Gtk.accelerator_name(ksym, gmod)
-        logging.debug("Received keybind: %s", kbstr)
+        # Display a meaningful debug message (if anyone will see it)
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            ksym = self.xdisp.keycode_to_keysym(keysig[0], 0)
+            gmod = Gdk.ModifierType(keysig[1])
+            kbstr = Gtk.accelerator_name(ksym, gmod)
+            logging.debug("Received keybind: %s (x%d)", kbstr, repeat)
 
         # Call the associated callback
-        self._keys[keysig]()
+        if keysig in self._repeatable:
+            callback(repeat=repeat)
+        else:
+            for _ in range(repeat):
+                callback()
 
     def parse_accel(self, accel: str) -> Optional[Tuple[int, int]]:
         """Convert an :ref:`accelerator string <keybinding-syntax>` into the
@@ -248,11 +325,81 @@ class KeyBinder(object):
             yield modmask | imask
 
 
+class CommandBindings(object):
+    """The set of commands bound to keys via a :class:`KeyBinder`, kept
+    up to date incrementally as the configuration changes.
+
+    :param keybinder: The key binder to grab keys with.
+    :param commands: The command registry used to map command names to
+        functions.
+    :param winman: The interface commands should use to take action.
+    """
+
+    def __init__(self, keybinder: KeyBinder, commands: CommandRegistry,
+                 winman: WindowManager):
+        self.keybinder = keybinder
+        self.commands = commands
+        self.winman = winman
+        self._prepared = {}  # type: Dict[str, PreparedCommand]
+
+    def dispatch(self, accel: str, repeat: int=1) -> None:
+        """Run the command currently bound to ``accel``
+
+        :param accel: The accelerator string which was pressed.
+        :param repeat: How many consecutive times it was pressed.
+        """
+        prepared = self._prepared.get(accel)
+        if prepared:
+            prepared(self.winman, repeat=repeat)
+
+    def update(self, modmask: Optional[str], mappings: Dict[str, str]):
+        """Bind ``mappings``, replacing whatever was bound before.
+
+        Every command is prepared again so it sees any changes to
+        :attr:`quicktile.commands.CommandRegistry.extra_state`, but only keys
+        which weren't bound before get grabbed and only keys which are no
+        longer bound get released, so keys which didn't change keep working
+        throughout.
+
+        :param modmask: A valid set of modifiers as accepted by
+            :func:`Gtk.accelerator_parse`, ``none``, an empty string, or
+            :any:`None`.
+        :param mappings: A dict mapping :ref:`accelerator strings
+            <keybinding-syntax>` to command names.
+        """
+        # Allow modmask to be empty for keybinds which don't share a common
+        # prefix
+        if not modmask or modmask.lower() == 'none':
+            modmask = ''
+
+        # Resolve commands now so keypresses don't have to
+        prepared = {}  # type: Dict[str, PreparedCommand]
+        for key, cmd in mappings.items():
+            command = self.commands.prepare(cmd)
+            if command:
+                prepared[modmask + key] = command
+            else:
+                logging.error("Not binding %s to unrecognized command: %s",
+                              modmask + key, cmd)
+
+        # Swap them all in at once so no keypress sees a mix of old and new
+        old, self._prepared = self._prepared, prepared
+
+        for accel in set(old) - set(prepared):
+            self.keybinder.unbind(accel)
+        for accel in set(prepared) - set(old):
+            if not self.keybinder.bind(accel, partial(self.dispatch, accel),
+                                       repeatable=True):
+                # Release any partial grab and retry on the next update
+                self.keybinder.unbind(accel)
+                del prepared[accel]
+
+
 def init(modmask: Optional[str],
          mappings: Dict[str, str],
          commands: CommandRegistry,
          winman: WindowManager,
-         ) -> Optional[KeyBinder]:
+         ) -> Optional[CommandBindings]:
     """Initialize the keybinder and bind the requested mappings
 
     :param modmask: A valid set of modifiers as accepted by
@@ -263,27 +410,16 @@ def init(modmask: Optional[str],
     :param commands: The command registry used to map command names to
         functions.
     :param winman: The interface commands should use to take action.
-    :returns: An instance of :class:`KeyBinder` or :any:`None` if ``winman``
-        didn't already have an X connection and attempting to open a new one
-        met with failure.
+    :returns: An instance of :class:`CommandBindings` or :any:`None` if
+        ``winman`` didn't already have an X connection and attempting to open
+        a new one met with failure.
     """
-    # Allow modmask to be empty for keybinds which don't share a common prefix
-    if not modmask or modmask.lower() == 'none':
-        modmask = ''
-
     try:
         keybinder = KeyBinder(x_display=winman.x_display)
     except XInitError as err:
         logging.error("%s", err)
         return None
-    else:
-        # TODO: Take a mapping dict with pre-modmasked keys
-        #       and pre-closured commands
-        for key, func in mappings.items():
-            def call(func=func):
-                """Closure to resolve `func` and call it on a
-                   `WindowManager` instance"""
-                commands.call(func, winman)
-
-            keybinder.bind(modmask + key, call)
-    return keybinder
+
+    bindings = CommandBindings(keybinder, commands, winman)
+    bindings.update(modmask, mappings)
+    return bindings
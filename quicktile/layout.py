@@ -13,11 +13,16 @@ import math
 from .util import Gravity, Rectangle
 
 # -- Type-Annotation Imports --
-from typing import Dict, List, Union
+from typing import Dict, List, Optional, Sequence, Union
+from typing import Tuple  # NOQA pylint: disable=unused-import
 from .util import GeomTuple, PercentRectTuple
+from .util import UsableRegion  # NOQA pylint: disable=unused-import
 
 #: MyPy type alias for either `Rectangle` or `GeomTuple`
 Geom = Union[Rectangle, GeomTuple]  # pylint: disable=invalid-name
+
+#: MyPy type alias for a set of named preset sequences
+Layout = Dict[str, List[PercentRectTuple]]  # pylint: disable=invalid-name
 # --
 
 
@@ -177,3 +182,88 @@ def make_winsplit_positions(columns: int) -> Dict[str, List[PercentRectTuple]]:
         positions[grav] = [gvlay(width, 0.5, grav) for width in edge_steps]
 
     return positions
+
+
+class PresetTable(object):
+    """Per-monitor tiling presets, resolved to pixel coordinates in advance.
+
+    Each (monitor ID, command name) pair maps to the list of rectangles
+    :func:`quicktile.commands.cycle_dimensions` should step through, already
+    converted from fractional geometry and clipped to the usable region.
+
+    The table is regenerated as a whole the first time it's consulted after
+    the :class:`quicktile.util.UsableRegion` it was built from changes.
+
+    :param column_counts: The :ref:`ColumnCount <ColumnCount>` to use for each
+        monitor, indexed by monitor ID. The last entry applies to any monitors
+        beyond the end of the list.
+    :param layouts: Presets already generated by
+        :func:`make_winsplit_positions`, keyed by column count. (eg. loaded
+        from a cache) Any others are generated as they're needed.
+    """
+
+    def __init__(self, column_counts: Sequence[int],
+                 layouts: Dict[int, Layout]=None):
+        if not column_counts:
+            raise ValueError("At least one column count must be provided")
+        if min(column_counts) < 1:
+            raise ValueError("Column counts must be at least 1: %r" %
+                             list(column_counts))
+
+        self.column_counts = list(column_counts)
+
+        #: The fractional presets generated so far, keyed by column count
+        self.layouts = dict(layouts or {})  # type: Dict[int, Layout]
+        self._table = {
+        }  # type: Dict[Tuple[int, str], List[Optional[Rectangle]]]
+        self._generation = None  # type: Optional[int]
+
+        #: The presets for the first monitor, suitable for passing to
+        #: :meth:`quicktile.commands.CommandRegistry.add_many`
+        self.default_layout = self.layout_for(0)
+
+    def layout_for(self, monitor_id: int) -> Layout:
+        """Return the fractional presets for the given monitor ID"""
+        columns = self.column_counts[min(monitor_id,
+                                         len(self.column_counts) - 1)]
+        if columns not in self.layouts:
+            self.layouts[columns] = make_winsplit_positions(columns)
+        return self.layouts[columns]
+
+    def max_presets(self, command: str) -> int:
+        """Return the most presets ``command`` has on any monitor
+
+        (Monitors may differ if :ref:`ColumnCount <ColumnCount>` does.)
+        """
+        return max(len(self.layout_for(monitor_id).get(command, ()))
+                   for monitor_id in range(len(self.column_counts)))
+
+    def get(self, region: UsableRegion, monitor_id: int, command: str
+            ) -> Optional[List[Optional[Rectangle]]]:
+        """Look up the pixel rectangles for a command on a monitor
+
+        :param region: The usable region the presets should fit within.
+        :param monitor_id: The ID of the monitor the window is on.
+        :param command: The name the presets were registered under.
+        :returns: The desktop-relative rectangles (or :any:`None` for presets
+            which don't fit) or :any:`None` if there is no such entry.
+        """
+        if region.generation != self._generation:
+            self.compile(region)
+        return self._table.get((monitor_id, command))
+
+    def compile(self, region: UsableRegion) -> None:
+        """Regenerate the table for the current state of ``region``"""
+        table = {}  # type: Dict[Tuple[int, str], List[Optional[Rectangle]]]
+        for monitor_id, monitor_rect in enumerate(region.monitors):
+            if not monitor_rect:
+                continue
+
+            for command, presets in self.layout_for(monitor_id).items():
+                table[(monitor_id, command)] = [
+                    region.clip_to_usable_region(resolve_fractional_geom(
+                        x, monitor_rect).from_relative(monitor_rect))
+                    for x in presets]
+
+        self._table = table
+        self._generation = region.generation
@@ -0,0 +1,268 @@
+"""UNIX socket API for controlling QuickTile
+
+A lighter-weight alternative to :mod:`quicktile.dbus_api` which needs nothing
+beyond the Python standard library on either end.
+
+The protocol is line-oriented UTF-8. Each line a client sends is a command as
+it would be given on the command line (``command@index`` syntax included) and
+the daemon answers each one, in order, with a line of the form::
+
+    <status> <milliseconds> <command>
+
+...where ``status`` is ``ok``, ``unknown`` (no such command), or ``error``
+(the command raised an exception) and ``milliseconds`` is how long it took to
+run. Every line gets a response, so blank lines are answered with ``error``.
+Clients may send as many commands as they like without waiting for the
+responses and the daemon will close the connection once the client has shut
+down its sending side and every command has been answered.
+
+.. code-block:: shell-session
+
+    $ printf 'top-left\\nmonitor-next\\n' | \\
+        socat - "UNIX-CONNECT:$XDG_RUNTIME_DIR/quicktile-$DISPLAY.sock"
+    ok 3.512 top-left
+    ok 2.874 monitor-next
+"""
+
+__author__ = "Stephan Sokolow (deitarion/SSokolow)"
+__license__ = "GNU GPL 2.0 or later"
+
+# Silence PyLint about my grouped imports
+# pylint: disable=wrong-import-order
+
+import errno, logging, os, socket, time
+
+import gi
+gi.require_version('GLib', '2.0')
+from gi.repository import GLib
+
+from .client import socket_path, STATUS_ERROR, STATUS_OK, STATUS_UNKNOWN
+
+# -- Type-Annotation Imports --
+from typing import Optional
+
+# Used only in type comments
+from typing import Dict, List, Tuple  # NOQA pylint: disable=unused-import
+from .commands import CommandRegistry
+from .wm import WindowManager
+# --
+
+#: Longest request line to accept before dropping the connection
+MAX_LINE_LENGTH = 4096
+
+
+class ControlConnection(object):
+    """Protocol state for a single client of :class:`ControlSocket`
+
+    :param commands: The command registry to resolve command names with.
+    :param winman: The window manager to invoke commands with.
+    """
+
+    def __init__(self, commands: CommandRegistry, winman: WindowManager):
+        self.commands = commands
+        self.winman = winman
+        self._buffer = b''
+
+        #: Responses which haven't been sent yet
+        self.outgoing = bytearray()
+        #: Whether the client has finished sending commands
+        self.finished = False
+
+    def feed(self, data: bytes, eof: bool=False) -> bytes:
+        """Run every complete command in ``data`` and return the responses.
+
+        :param data: Bytes received from the client.
+        :param eof: Whether the client has finished sending, in which case
+            an unterminated final line is treated as a command too.
+        :raises ValueError: The client sent a line longer than
+            :data:`MAX_LINE_LENGTH`.
+        """
+        lines = (self._buffer + data).split(b'\n')
+        self._buffer = lines.pop()
+        if eof and self._buffer:
+            lines.append(self._buffer)
+            self._buffer = b''
+        if len(self._buffer) > MAX_LINE_LENGTH:
+            raise ValueError("Request line too long")
+
+        # Answer every line, even blank ones, so clients can match responses
+        # to what they sent by counting
+        return ''.join(self.run(line.decode('utf8', 'replace').strip())
+                       for line in lines).encode('utf8')
+
+    def run(self, command: str) -> str:
+        """Run a single command and format the response line for it"""
+        start = time.perf_counter()
+        if not command:
+            status = STATUS_ERROR
+        else:
+            try:
+                found = self.commands.call(command, self.winman)
+            except Exception:  # pylint: disable=broad-except
+                logging.exception("Error running command %r from control "
+                                  "socket", command)
+                status = STATUS_ERROR
+            else:
+                status = STATUS_OK if found else STATUS_UNKNOWN
+
+        return '%s %.3f %s\n' % (
+            status, (time.perf_counter() - start) * 1000, command)
+
+
+class ControlSocket(object):
+    """Listener which serves :class:`ControlConnection` clients from the
+    GLib main loop.
+
+    :param path: The filesystem path to listen on.
+    :param commands: The command registry to resolve command names with.
+    :param winman: The window manager to invoke commands with.
+    :raises OSError: The socket could not be created.
+    """
+
+    def __init__(self, path: str, commands: CommandRegistry,
+                 winman: WindowManager):
+        self.path = path
+        self.commands = commands
+        self.winman = winman
+        self._clients = {}  # type: Dict[int, Tuple[int, socket.socket]]
+
+        # Only replace the socket if nothing is listening on it
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            pass
+        else:
+            raise OSError(errno.EADDRINUSE,
+                          "Another QuickTile is listening", path)
+        finally:
+            probe.close()
+
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            self.sock.bind(path)
+        finally:
+            os.umask(old_umask)
+        self.sock.listen(16)
+        self.sock.setblocking(False)
+
+        self._watch = GLib.io_add_watch(self.sock, GLib.PRIORITY_DEFAULT,
+                                        GLib.IO_IN, self.cb_accept)
+
+    def close(self):
+        """Stop listening, drop all clients, and remove the socket file"""
+        GLib.source_remove(self._watch)
+        for watch, conn in self._clients.values():
+            GLib.source_remove(watch)
+            conn.close()
+        self._clients.clear()
+        self.sock.close()
+
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def cb_accept(self, src: socket.socket, cond: GLib.IOCondition) -> bool:
+        """:func:`GLib.io_add_watch` callback to accept new clients
+
+        :returns: Always :any:`True` to keep the watch installed.
+        """
+        try:
+            conn, _ = self.sock.accept()
+        except OSError as err:
+            logging.debug("Failed to accept control connection: %s", err)
+            return True
+
+        # Never block, so a client which stops reading can't hang the daemon
+        conn.setblocking(False)
+        self._watch_client(conn, ControlConnection(self.commands, self.winman))
+        return True
+
+    @staticmethod
+    def _conditions(protocol: ControlConnection) -> GLib.IOCondition:
+        """Return what a client's watch should wait for in its current state
+
+        Writability is only watched for while responses are queued, since
+        GLib would otherwise call :meth:`cb_client` continuously.
+        """
+        cond = GLib.IO_HUP | GLib.IO_ERR
+        if not protocol.finished:
+            cond |= GLib.IO_IN
+        if protocol.outgoing:
+            cond |= GLib.IO_OUT
+        return cond
+
+    def _watch_client(self, conn: socket.socket, protocol: ControlConnection):
+        """Install a watch for whatever ``conn`` is currently waiting on"""
+        watch = GLib.io_add_watch(conn, GLib.PRIORITY_DEFAULT,
+            self._conditions(protocol),
+            lambda src, cond: self.cb_client(conn, protocol))
+        self._clients[conn.fileno()] = (watch, conn)
+
+    def cb_client(self, conn: socket.socket, protocol: ControlConnection
+                  ) -> bool:
+        """:func:`GLib.io_add_watch` callback to serve a connected client
+
+        Reads whatever commands have arrived, runs them, and sends as much of
+        the queued responses as the socket will take without blocking.
+
+        :returns: :any:`False` to remove the watch once the client is done or
+            when it's being replaced by one waiting on different conditions.
+        """
+        old_cond = self._conditions(protocol)
+        try:
+            if not protocol.finished:
+                try:
+                    data = conn.recv(65536)
+                except BlockingIOError:
+                    pass
+                else:
+                    protocol.outgoing += protocol.feed(data, eof=not data)
+                    protocol.finished = not data
+
+            if protocol.outgoing:
+                try:
+                    del protocol.outgoing[:conn.send(protocol.outgoing)]
+                except BlockingIOError:
+                    pass
+        except (OSError, ValueError) as err:
+            logging.debug("Dropping control connection: %s", err)
+            protocol.finished, protocol.outgoing = True, bytearray()
+
+        if protocol.finished and not protocol.outgoing:
+            self._clients.pop(conn.fileno(), None)
+            conn.close()
+            return False
+
+        if self._conditions(protocol) == old_cond:
+            return True
+        self._watch_client(conn, protocol)
+        return False
+
+
+def init(commands: CommandRegistry,
+         winman: WindowManager,
+         ) -> Optional[ControlSocket]:
+    """Initialize the control socket at :func:`quicktile.client.socket_path`
+
+    :returns: The listener or :any:`None` if it couldn't be set up.
+    """
+    path = socket_path()
+    if not path:
+        logging.warning("XDG_RUNTIME_DIR is not set. Not creating a control "
+                        "socket.")
+        return None
+
+    try:
+        return ControlSocket(path, commands, winman)
+    except OSError as err:
+        logging.warning("Could not create control socket at %s: %s",
+                        path, err)
+        return None
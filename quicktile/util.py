@@ -9,14 +9,12 @@ __license__ = "GNU GPL 2.0 or later"
 # pylint: disable=wrong-import-order
 
 import math, sys
+from array import array
 from collections import namedtuple
 from enum import Enum, IntEnum, unique
-from itertools import chain, combinations
+from itertools import chain, combinations, repeat
 
-import gi
 from functools import reduce  # pylint: disable=redefined-builtin
-gi.require_version('Gdk', '3.0')
-from gi.repository import Gdk
 
 # -- Type-Annotation Imports --
 from typing import (Any, Callable, Iterable, Iterator, List, Optional,
@@ -491,9 +489,8 @@ class Rectangle(_Rectangle):
         elif new.x2 > other.x2:
             # TODO: Rework Rectangle so x can be omitted as long as width
             #       and x2 are supplied.
-            new = Rectangle(
-                x=max(other.x2 - new.width, 0), y=new.y,
-                width=new.width, height=new.height)
+            new = Rectangle.from_xywh(
+                max(other.x2 - new.width, 0), new.y, new.width, new.height)
 
         # Slide up or down (prefer aligning tops if too tall)
         if new.y < other.y:
@@ -501,9 +498,8 @@ class Rectangle(_Rectangle):
         elif new.y2 > other.y2:
             # TODO: Rework Rectangle so y can be omitted as long as height
             #       and y2 are supplied.
-            new = Rectangle(
-                x=new.x, y=max(other.y2 - new.height, 0),
-                width=new.width, height=new.height)
+            new = Rectangle.from_xywh(
+                new.x, max(other.y2 - new.height, 0), new.width, new.height)
 
         return new
 
@@ -537,15 +533,12 @@ class Rectangle(_Rectangle):
         if not self.intersect(other):
             return self
 
+        x, y, width, height = self
         return self.closest_of([
-            Rectangle(  # Push left
-                y=self.y, width=self.width, height=self.height, x2=other.x),
-            Rectangle(  # Push right
-                y=self.y, width=self.width, height=self.height, x=other.x2),
-            Rectangle(  # Push up
-                x=self.x, width=self.width, height=self.height, y2=other.y),
-            Rectangle(  # Push down
-                x=self.x, width=self.width, height=self.height, y=other.y2),
+            Rectangle.from_xywh(other.x - width, y, width, height),  # Left
+            Rectangle.from_xywh(other.x2, y, width, height),  # Right
+            Rectangle.from_xywh(x, other.y - height, width, height),  # Up
+            Rectangle.from_xywh(x, other.y2, width, height),  # Down
         ])
 
     def intersect(self, other: 'Rectangle') -> 'Rectangle':
@@ -570,7 +563,7 @@ class Rectangle(_Rectangle):
         x1, y1 = max(self.x, other.x), max(self.y, other.y)
         x2, y2 = min(self.x2, other.x2), min(self.y2, other.y2)
 
-        return Rectangle(x1, y1, max(0, x2 - x1), max(0, y2 - y1))
+        return Rectangle.from_xywh(x1, y1, max(0, x2 - x1), max(0, y2 - y1))
 
     def subtract(self, other: 'Rectangle') -> 'Rectangle':
         """Return a copy of ``self`` which has been shrunk along one axis
@@ -647,7 +640,7 @@ class Rectangle(_Rectangle):
         x1, y1 = min(self.x, other.x), min(self.y, other.y)
         x2, y2 = max(self.x2, other.x2), max(self.y2, other.y2)
 
-        return Rectangle(x1, y1, max(0, x2 - x1), max(0, y2 - y1))
+        return Rectangle.from_xywh(x1, y1, max(0, x2 - x1), max(0, y2 - y1))
 
     def from_relative(self, other_rect: 'Rectangle') -> 'Rectangle':
         """Interpret self as relative to ``other_rect`` and make it absolute.
@@ -720,14 +713,33 @@ class Rectangle(_Rectangle):
             y=int(self.y + (self.height * gravity.value[1]))
         )
 
+    @classmethod
+    def from_xywh(cls, x: int, y: int, width: int, height: int
+                  ) -> 'Rectangle':
+        """Trusted fast-path constructor which skips all validation
+
+        Unlike the regular constructor, this doesn't check the argument
+        combination, flip negative sizes, or cast to :any:`int`, so it must
+        only be used for values which are already normalized, such as the
+        output of other :class:`Rectangle` methods or geometry retrieved from
+        the X server.
+
+        .. doctest::
+
+            >>> Rectangle.from_xywh(1, 2, 3, 4)
+            Rectangle(x=1, y=2, width=3, height=4)
+        """
+        return tuple.__new__(cls, (x, y, width, height))  # type: ignore
+
     @classmethod
     def from_gdk(cls, gdk_rect):
         """Factory function to convert from a :class:`Gdk.Rectangle`
 
-        This assumes top-left gravity.
+        This assumes top-left gravity and, like :meth:`from_xywh`, trusts GDK
+        to provide integers and non-negative sizes.
         """
-        return cls(x=gdk_rect.x, y=gdk_rect.y,
-                   width=gdk_rect.width, height=gdk_rect.height)
+        return tuple.__new__(cls, (gdk_rect.x, gdk_rect.y,
+                                   gdk_rect.width, gdk_rect.height))
 
     def to_gdk(self):
         """Helper to easily create a :class:`Gdk.Rectangle` from a
@@ -735,6 +747,11 @@ class Rectangle(_Rectangle):
 
         This assumes top-left gravity.
         """
+        # Imported here so the rest of this module doesn't need GTK+
+        import gi
+        gi.require_version('Gdk', '3.0')
+        from gi.repository import Gdk
+
         gdk_rect = Gdk.Rectangle()
         gdk_rect.x = self.x
         gdk_rect.y = self.y
@@ -746,12 +763,239 @@ class Rectangle(_Rectangle):
 del _Rectangle
 
 
+def _closest_of(rect: GeomTuple, candidates: List[Tuple[int, ...]]
+                ) -> GeomTuple:
+    """Scalar core of :meth:`RectangleArray.closest_of`
+
+    :param rect: The ``(x, y, width, height)`` to find the closest match for.
+    :param candidates: ``(x, y, width, height, x2, y2, center_x, center_y)``
+        tuples for each candidate, in the order they were provided.
+    """
+    x, y, width, height = rect
+    x2, y2 = x + width, y + height
+    center_x = int(x + (width * Gravity.CENTER.value[0]))
+    center_y = int(y + (height * Gravity.CENTER.value[1]))
+
+    best = None
+    for c_x, c_y, c_w, c_h, c_x2, c_y2, c_cx, c_cy in candidates:
+        area = (max(0, min(x2, c_x2) - max(x, c_x)) *
+                max(0, min(y2, c_y2) - max(y, c_y)))
+        choice = (area,
+                  -math.sqrt((center_x - c_cx) ** 2 + (center_y - c_cy) ** 2),
+                  (c_x, c_y, c_w, c_h))
+        if best is None or choice > best:
+            best = choice
+
+    if best is None:
+        raise ValueError("closest_of() requires at least one candidate")
+    return best[-1]
+
+
+def _subtract(rect: GeomTuple, other: GeomTuple) -> GeomTuple:
+    """Scalar core of :meth:`RectangleArray.subtract`
+
+    (Mirrors :meth:`Rectangle.subtract` without constructing intermediate
+    :class:`Rectangle` instances.)
+    """
+    x, y, width, height = rect
+    o_x, o_y, o_w, o_h = other
+    x2, y2, o_x2, o_y2 = x + width, y + height, o_x + o_w, o_y + o_h
+
+    # No overlap means nothing to subtract
+    if not (max(0, min(x2, o_x2) - max(x, o_x)) and
+            max(0, min(y2, o_y2) - max(y, o_y))):
+        return rect
+
+    # Push left, right, up, or down as in Rectangle.moved_off_of
+    pushes = []
+    for p_x, p_y in ((o_x - width, y), (o_x2, y),
+                     (x, o_y - height), (x, o_y2)):
+        pushes.append((p_x, p_y, width, height, p_x + width, p_y + height,
+            int(p_x + (width * Gravity.CENTER.value[0])),
+            int(p_y + (height * Gravity.CENTER.value[1]))))
+    m_x, m_y = _closest_of(rect, pushes)[:2]
+
+    # ...and then intersect with the original
+    i_x, i_y = max(x, m_x), max(y, m_y)
+    return (i_x, i_y, max(0, min(x2, m_x + width) - i_x),
+            max(0, min(y2, m_y + height) - i_y))
+
+
+class RectangleArray(object):
+    """A batch of rectangles stored as columns of integers
+
+    This allows operations which touch many windows to do their geometry math
+    in a single pass without constructing a :class:`Rectangle` for every
+    intermediate value. Each method produces the same results as calling the
+    :class:`Rectangle` method of the same name on each member.
+
+    Methods which take an ``other`` argument accept either a single
+    :class:`Rectangle`, which will be applied to every member, or a
+    :class:`RectangleArray` of the same length, which will be applied
+    pairwise.
+
+    :param rects: The initial contents.
+    :raises TypeError: ``rects`` contained something other than a
+        :class:`Rectangle`.
+
+    .. doctest::
+
+        >>> rects = RectangleArray([Rectangle(0, 0, 40, 40),
+        ...                         Rectangle(30, 30, 20, 20)])
+        >>> clipped = rects.intersect(Rectangle(10, 10, 30, 30))
+        >>> clipped[1]
+        Rectangle(x=30, y=30, width=10, height=10)
+    """
+    __slots__ = ('x', 'y', 'width', 'height')
+
+    def __init__(self, rects: Iterable[Rectangle]=()):
+        self.x = array('i')
+        self.y = array('i')
+        self.width = array('i')
+        self.height = array('i')
+
+        for rect in rects:
+            self.append(rect)
+
+    @classmethod
+    def _from_rows(cls, rows: Iterable[GeomTuple]) -> 'RectangleArray':
+        """Build a new instance from ``(x, y, width, height)`` tuples which
+        are already known to be normalized."""
+        result = cls()
+        columns = list(zip(*rows))
+        if columns:
+            result.x.extend(columns[0])
+            result.y.extend(columns[1])
+            result.width.extend(columns[2])
+            result.height.extend(columns[3])
+        return result
+
+    def _rows(self) -> Iterator[GeomTuple]:
+        """Iterate over the members as plain tuples"""
+        return zip(self.x, self.y, self.width, self.height)
+
+    def _other_rows(self, other: 'Union[Rectangle, RectangleArray]'
+                    ) -> Iterator[GeomTuple]:
+        """Broadcast ``other`` to match the length of ``self``
+
+        :raises TypeError: ``other`` was not a :class:`Rectangle` or
+            :class:`RectangleArray`.
+        :raises ValueError: ``other`` was a :class:`RectangleArray` with a
+            different length.
+        """
+        if isinstance(other, Rectangle):
+            return repeat(tuple(other), len(self))
+        elif isinstance(other, RectangleArray):
+            if len(other) != len(self):
+                raise ValueError("RectangleArray lengths differ: %d != %d" % (
+                    len(self), len(other)))
+            return other._rows()  # pylint: disable=protected-access
+        raise TypeError("Expected Rectangle or RectangleArray, got %r" %
+                        type(other))
+
+    def append(self, rect: Rectangle) -> None:
+        """Add a rectangle to the end of the array
+
+        :raises TypeError: ``rect`` was not a :class:`Rectangle`.
+        """
+        if not isinstance(rect, Rectangle):
+            raise TypeError("Can only store Rectangles")
+        self.x.append(rect.x)
+        self.y.append(rect.y)
+        self.width.append(rect.width)
+        self.height.append(rect.height)
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def __getitem__(self, idx: int) -> Rectangle:
+        return Rectangle.from_xywh(self.x[idx], self.y[idx],
+                                   self.width[idx], self.height[idx])
+
+    def __iter__(self) -> Iterator[Rectangle]:
+        for row in self._rows():
+            yield Rectangle.from_xywh(*row)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, RectangleArray):
+            return NotImplemented
+        return (self.x == other.x and self.y == other.y and
+                self.width == other.width and self.height == other.height)
+
+    def __ne__(self, other: object) -> bool:
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __repr__(self) -> str:
+        return "RectangleArray(%r)" % list(self)
+
+    def intersect(self, other: 'Union[Rectangle, RectangleArray]'
+                  ) -> 'RectangleArray':
+        """Vectorized equivalent to :meth:`Rectangle.intersect`"""
+        rows = []
+        for (x, y, w, h), (o_x, o_y, o_w, o_h) in zip(
+                self._rows(), self._other_rows(other)):
+            x1, y1 = max(x, o_x), max(y, o_y)
+            rows.append((x1, y1, max(0, min(x + w, o_x + o_w) - x1),
+                         max(0, min(y + h, o_y + o_h) - y1)))
+        return self._from_rows(rows)
+
+    def union(self, other: 'Union[Rectangle, RectangleArray]'
+              ) -> 'RectangleArray':
+        """Vectorized equivalent to :meth:`Rectangle.union`"""
+        rows = []
+        for (x, y, w, h), (o_x, o_y, o_w, o_h) in zip(
+                self._rows(), self._other_rows(other)):
+            x1, y1 = min(x, o_x), min(y, o_y)
+            rows.append((x1, y1, max(0, max(x + w, o_x + o_w) - x1),
+                         max(0, max(y + h, o_y + o_h) - y1)))
+        return self._from_rows(rows)
+
+    def subtract(self, other: 'Union[Rectangle, RectangleArray]'
+                 ) -> 'RectangleArray':
+        """Vectorized equivalent to :meth:`Rectangle.subtract`"""
+        return self._from_rows(_subtract(row, other_row) for row, other_row
+                               in zip(self._rows(), self._other_rows(other)))
+
+    def closest_of(self, candidates: Sequence[Rectangle]) -> 'RectangleArray':
+        """Vectorized equivalent to :meth:`Rectangle.closest_of`
+
+        :param candidates: Rectangles to consider for closeness. The same
+            candidates are considered for every member.
+        :raises ValueError: ``candidates`` was empty.
+        """
+        prepared = [(c.x, c.y, c.width, c.height, c.x2, c.y2,
+                     int(c.x + (c.width * Gravity.CENTER.value[0])),
+                     int(c.y + (c.height * Gravity.CENTER.value[1])))
+                    for c in candidates]
+        return self._from_rows(_closest_of(row, prepared)
+                               for row in self._rows())
+
+    def from_relative(self, other: 'Union[Rectangle, RectangleArray]'
+                      ) -> 'RectangleArray':
+        """Vectorized equivalent to :meth:`Rectangle.from_relative`"""
+        return self._from_rows((x + o_x, y + o_y, w, h)
+            for (x, y, w, h), (o_x, o_y, _, _)
+            in zip(self._rows(), self._other_rows(other)))
+
+    def to_relative(self, other: 'Union[Rectangle, RectangleArray]'
+                    ) -> 'RectangleArray':
+        """Vectorized equivalent to :meth:`Rectangle.to_relative`"""
+        return self._from_rows((x - o_x, y - o_y, w, h)
+            for (x, y, w, h), (o_x, o_y, _, _)
+            in zip(self._rows(), self._other_rows(other)))
+
+
 class UsableRegion(object):
     """A representation of the usable portion of a desktop
 
     This stores a set of monitors and a set of :class:`StrutPartial` instances
     and can be used to clip or move window rectangles to fit within the usable
     space.
+
+    If the window manager publishes per-monitor work areas, they can be
+    provided via :meth:`set_workareas` and will take precedence over the
+    struts.
     """
 
     def __init__(self):
@@ -759,20 +1003,69 @@ class UsableRegion(object):
         self._monitors = []  # type: List[Rectangle]
         self._struts = []    # type: List[StrutPartial]
         self._strut_rects = []  # type: List[Rectangle]
+        self._workareas_raw = []  # type: List[Rectangle]
+        self._workareas = {}  # type: Dict[Rectangle, Rectangle]
+        self._monitor_ids = {}  # type: Dict[Rectangle, int]
+
+        # Per-monitor lists of the strut rectangles that overlap each monitor
+        # and the largest rectangle on each monitor that none of them touch
+        self._monitor_struts = {}  # type: Dict[Rectangle, List[Rectangle]]
+        self._clear_rects = {}  # type: Dict[Rectangle, Rectangle]
+
+        #: Incremented each time the internal caches are regenerated so that
+        #: anything derived from this region can tell when it's gone stale.
+        self.generation = 0
 
     # TODO: Subscribe to monitor hotplugging in the code which calls this
     def set_monitors(self, monitor_rects: Iterable[Rectangle]):
         """Set the list of monitor rectangles from which to calculate usable
-        regions"""
-        self._monitors_raw = list(monitor_rects)
-        self._update()
+        regions
+
+        The position of each rectangle in the list is its monitor ID.
+
+        (Internal caches will only be regenerated if the list has changed.)
+        """
+        monitor_rects = list(monitor_rects)
+        if monitor_rects != self._monitors_raw:
+            self._monitors_raw = monitor_rects
+            self._update()
 
     # TODO: Subscribe to changes to panel geometry in the code which calls this
     def set_panels(self, panel_struts: Iterable[StrutPartial]):
         """Set the list of desktop struts to excluded from the usable regions
+
+        (Internal caches will only be regenerated if the list has changed.)
         """
-        self._struts = list(panel_struts)
-        self._update()
+        panel_struts = list(panel_struts)
+        if panel_struts != self._struts:
+            self._struts = panel_struts
+            self._update()
+
+    @property
+    def monitors(self) -> List[Rectangle]:
+        """The monitor rectangles, as passed to :meth:`set_monitors`, indexed
+        by monitor ID."""
+        return list(self._monitors_raw)
+
+    def set_workareas(self, workarea_rects: Optional[Iterable[Rectangle]]
+                      ) -> bool:
+        """Set the usable rectangle for each monitor directly, as published
+        by the window manager in properties like ``_GTK_WORKAREAS_D0`` or
+        ``_NET_WORKAREA``, rather than deriving it from the panel struts.
+
+        The work areas will only be used if each monitor contains exactly one
+        of them. (eg. A single ``_NET_WORKAREA`` spanning several monitors
+        can't express panels which only reserve space on one.)
+
+        :param workarea_rects: The work area rectangles in desktop-relative
+            coordinates, or :any:`None` to go back to using struts.
+        :returns: Whether the work areas were accepted.
+        """
+        workarea_rects = list(workarea_rects or [])
+        if workarea_rects != self._workareas_raw:
+            self._workareas_raw = workarea_rects
+            self._update()
+        return bool(self._workareas)
 
     def _update(self):
         """Check input values and regenerate internal caches
@@ -780,9 +1073,10 @@ class UsableRegion(object):
         This is internal code shared by :meth:`set_monitors` and
         :meth:`set_panels`.
 
-        :raises TypeError: The internal list of monitors contains an entry
-            that is not a :class:`Rectangle` or the internal list of struts
-            contains an entry that is not a :class:`StrutPartial`.
+        :raises TypeError: The internal lists of monitors or work areas
+            contain an entry that is not a :class:`Rectangle` or the internal
+            list of struts contains an entry that is not a
+            :class:`StrutPartial`.
 
         .. todo:: Disable documenting private members once I've refactored the
             others which currently should be documented.
@@ -796,28 +1090,76 @@ class UsableRegion(object):
             if not isinstance(strut, StrutPartial):
                 raise TypeError("struts must be of type StrutPartial")
                 # ...so they can be re-calculated on resolution change
+        for rect in self._workareas_raw:
+            if not isinstance(rect, Rectangle):
+                raise TypeError("workareas must be of type Rectangle")
 
         # Exclude monitors with zero area
         self._monitors = [x for x in self._monitors_raw if x]
 
+        # Map monitor rectangles back to their IDs, preferring the lowest
+        self._monitor_ids = {}
+        for monitor_id, rect in reversed(list(enumerate(self._monitors_raw))):
+            self._monitor_ids[rect] = monitor_id
+
+        # Only trust work areas if they map one-to-one onto the monitors
+        workareas = {}  # type: Dict[Rectangle, Rectangle]
+        for monitor in self._monitors:
+            matches = [x for x in self._workareas_raw if x and x in monitor]
+            if len(matches) != 1:
+                workareas = {}
+                break
+            workareas[monitor] = matches[0]
+        self._workareas = workareas
+
         # Calculate the desktop rectangle (and ensure it extends to (0, 0))
         desktop_rect = reduce(lambda x, y: x.union(y), self._monitors,
             Rectangle(0, 0, 0, 0))
 
-        # Resolve the struts to Rectangles relative to desktop_rect
+        # Resolve the struts to Rectangles relative to desktop_rect and
+        # sort them by which monitors they overlap so that clipping and moving
+        # only need to consider the struts on the relevant monitor.
+        #
+        # (Trimming only ever shrinks a strut rectangle, so monitors it didn't
+        #  overlap before trimming can be ruled out up front.)
         strut_rects = []  # type: List[Rectangle]
+        monitor_struts = {
+            x: [] for x in self._monitors
+        }  # type: Dict[Rectangle, List[Rectangle]]
         for strut in self._struts:
             # TODO: Test for off-by-one bugs
-            # TODO: Think of a more efficient way to do this
             for strut_pair in strut.as_rects(desktop_rect):
-                    strut_rects.append(self._trim_strut(strut_pair))
+                candidates = [x for x in self._monitors
+                              if x.intersect(strut_pair[1])]
+                strut_rect = self._trim_strut(strut_pair, candidates)
+                strut_rects.append(strut_rect)
+                for monitor in candidates:
+                    if monitor.intersect(strut_rect):
+                        monitor_struts[monitor].append(strut_rect)
         self._strut_rects = strut_rects
+        self._monitor_struts = monitor_struts
+
+        self._clear_rects = {}
+        for monitor, panels in monitor_struts.items():
+            clear_rect = monitor
+            for panel in panels:
+                clear_rect = clear_rect.subtract(panel)
+            self._clear_rects[monitor] = clear_rect
+
+        self.generation += 1
 
-    def _trim_strut(self, strut: Tuple[Edge, Rectangle]) -> Rectangle:
-        """Trim a strut rectangle to just the monitor it applies to"""
+    def _trim_strut(self, strut: Tuple[Edge, Rectangle],
+                    monitors: Optional[List[Rectangle]]=None) -> Rectangle:
+        """Trim a strut rectangle to just the monitor it applies to
+
+        :param strut: The strut rectangle and the desktop edge it's
+            attached to.
+        :param monitors: The monitors to consider, if it's already known that
+            the strut can't overlap the others.
+        """
         edge, strut_rect = strut
 
-        for monitor in self._monitors:
+        for monitor in self._monitors if monitors is None else monitors:
             overlap = monitor.intersect(strut_rect)
             if not bool(overlap):
                 continue
@@ -873,9 +1215,15 @@ class UsableRegion(object):
         if not monitor:
             return None
 
+        if monitor in self._workareas:
+            return rect.intersect(self._workareas[monitor]) or None
+
+        # Struts that don't overlap the monitor can't overlap anything
+        # which has been clipped to it.
         rect = rect.intersect(monitor)
-        for panel in self._strut_rects:
-            rect = rect.subtract(panel)
+        if rect not in self._clear_rects[monitor]:
+            for panel in self._monitor_struts[monitor]:
+                rect = rect.subtract(panel)
 
         # Apparently MyPy can't see through custom __bool__ implementations
         return rect or None  # type: ignore
@@ -888,7 +1236,25 @@ class UsableRegion(object):
         if not monitor:
             return None
 
+        if monitor in self._workareas:
+            return rect.moved_into(self._workareas[monitor])
+
         rect = rect.moved_into(monitor)
+        if rect in self._clear_rects[monitor]:
+            return rect
+
+        # As long as the rectangle stays on the monitor, only that monitor's
+        # struts can affect it...
+        moved = rect
+        for panel in self._monitor_struts[monitor]:
+            if moved not in monitor:
+                break
+            moved = moved.moved_off_of(panel)
+        else:
+            if moved in monitor:
+                return moved
+
+        # ...but if it got pushed off, start over and consider them all
         for panel in self._strut_rects:
             rect = rect.moved_off_of(panel)
 
@@ -907,6 +1273,34 @@ class UsableRegion(object):
         else:
             return None
 
+    def find_monitor_id_for(self, rect: Rectangle
+                            ) -> Optional[Tuple[int, Rectangle]]:
+        """Like :meth:`find_monitor_for` but also return the ID of the
+        monitor (its position in the list passed to :meth:`set_monitors`).
+
+        :param rect: A rectangle (possibly of zero width and height),
+            representing a point of reference for the monitor search.
+        :returns: ``(monitor_id, geometry)`` or :any:`None` if there are no
+            monitors.
+        """
+        monitor = self.find_monitor_for(rect)
+        if monitor is None:
+            return None
+        return self._monitor_ids[monitor], monitor
+
+    def find_monitor_ids_for(self, rects: RectangleArray
+                             ) -> List[Tuple[int, Rectangle]]:
+        """Batch equivalent to :meth:`find_monitor_id_for`
+
+        :param rects: The rectangles to look up monitors for.
+        :returns: A ``(monitor_id, geometry)`` pair for each member of
+            ``rects`` or an empty list if there are no monitors.
+        """
+        if not self._monitors:
+            return []
+        return [(self._monitor_ids[monitor], monitor)
+                for monitor in rects.closest_of(self._monitors)]
+
     def __bool__(self) -> bool:
         """A :class:`UsableRegion` is truthy if it has at least one monitor
         with nonzero area.
@@ -8,50 +8,61 @@ __license__ = "GNU GPL 2.0 or later"
 # pylint: disable=unsubscriptable-object
 # pylint: disable=wrong-import-order
 
-import logging
+import logging, time
 from contextlib import contextmanager
 
 from Xlib.display import Display as XDisplay
-from Xlib.error import DisplayConnectionError
-from Xlib import Xatom
+from Xlib.error import BadWindow, CatchError, DisplayConnectionError
+from Xlib import X, Xatom
+from Xlib.protocol import event as xevent, request as xrequest
 
 import gi
+gi.require_version('GLib', '2.0')
 gi.require_version('Gtk', '3.0')
 gi.require_version('Gdk', '3.0')
 gi.require_version('Wnck', '3.0')
 
-from gi.repository import Gdk, GdkX11, Wnck
+from gi.repository import Gdk, GLib, Wnck
 
-from .util import (clamp_idx, Rectangle, UsableRegion, StrutPartial,
-                   XInitError)
+from .util import (clamp_idx, Rectangle, RectangleArray, UsableRegion,
+                   StrutPartial, XInitError)
 
 # -- Type-Annotation Imports --
-from typing import Any, Iterable, Optional, Tuple, Union
+from typing import Any, Iterable, Optional, Sequence, Tuple, Union
+
+# Used only in type comments
+from typing import Dict, List, Set  # NOQA pylint: disable=unused-import
 # ---
 
+#: Properties which, when changed on a client window, invalidate the strut
+#: reservations recorded for it by :meth:`WindowManager.watch_struts`
+STRUT_ATOMS = ('_NET_WM_STRUT_PARTIAL', '_NET_WM_STRUT')
 
-@contextmanager
-def persist_maximization(win: Wnck.Window, keep_maximize: bool=True):
-    """Context manager to persist maximization state after a call to
-    :any:`WindowManager.reposition`.
+#: The ``_NET_WM_STATE`` atoms which make a window maximized
+MAXIMIZED_ATOMS = ('_NET_WM_STATE_MAXIMIZED_VERT',
+                   '_NET_WM_STATE_MAXIMIZED_HORZ')
 
-    :param win: The window to operate on.
-    :param keep_maximize: If :any:`False`, this decoration becomes a no-op to
-        ease writing clean code which needs to support both behaviours.
-    """
-    # Unmaximize and record the types we may need to restore
-    max_types, maxed = ['', '_horizontally', '_vertically'], []
-    for maxtype in max_types:
-        if getattr(win, 'is_maximized' + maxtype)():
-            maxed.append(maxtype)
-            getattr(win, 'unmaximize' + maxtype)()
+#: ``_NET_WM_STATE`` client message actions as defined by the EWMH spec
+NET_WM_STATE_REMOVE, NET_WM_STATE_ADD = 0, 1
 
-    yield
+#: EWMH source indication declaring that a request comes from a pager or other
+#: tool acting on the user's direct instructions
+SOURCE_PAGER = 2
 
-    # Restore maximization if asked
-    if maxed and keep_maximize:
-        for maxtype in maxed:
-            getattr(win, 'maximize' + maxtype)()
+#: Valid values for :attr:`WindowManager.moveresize_backend`
+MOVERESIZE_BACKENDS = ('wnck', 'xlib')
+
+#: Atoms to be interned in a single batch when :class:`WindowManager` is
+#: initialized. (Others will still be interned lazily on first use.)
+ATOMS = STRUT_ATOMS + MAXIMIZED_ATOMS + (
+    '_NET_CLIENT_LIST',
+    '_NET_CURRENT_DESKTOP',
+    '_NET_FRAME_EXTENTS',
+    '_NET_MOVERESIZE_WINDOW',
+    '_NET_WM_STATE',
+    '_NET_WORKAREA',
+    '_QUICKTILE_CYCLE_POS',
+)
 
 
 class WindowManager(object):
@@ -73,6 +84,30 @@ class WindowManager(object):
        in KDE 3.x. Not sure what would be equivalent elsewhere.)
     """
 
+    #: How many seconds may pass between full strut scans when
+    #: :meth:`watch_struts` isn't active. In between, only windows of type
+    #: :any:`Wnck.WindowType.DOCK` and windows which had a strut in the
+    #: previous scan will be queried. Set to ``0`` to always do a full scan.
+    strut_scan_interval = 60
+
+    #: Whether to use the work areas published by the window manager in
+    #: ``_GTK_WORKAREAS_D<n>`` or ``_NET_WORKAREA`` (when they make sense for
+    #: the current monitor layout) instead of calculating the usable region
+    #: from panel struts.
+    use_workarea_hints = True
+
+    #: How to ask the window manager to move and resize windows. ``'wnck'``
+    #: uses :meth:`Wnck.Window.set_geometry` while ``'xlib'`` sends
+    #: ``_NET_MOVERESIZE_WINDOW`` directly through :attr:`x_display`.
+    #: (See :any:`MOVERESIZE_BACKENDS`)
+    moveresize_backend = 'wnck'
+
+    #: How many milliseconds to wait before writing positions recorded by
+    #: :meth:`set_cycle_pos` back to ``_QUICKTILE_CYCLE_POS`` while
+    #: :attr:`watching_struts` is set. (Until then, they're only kept in
+    #: memory.)
+    cycle_pos_write_delay = 1000
+
     def __init__(self, screen: Gdk.Screen=None, x_display: XDisplay=None):
         self.gdk_screen = screen or Gdk.Screen.get_default()
         if self.gdk_screen is None:
@@ -95,9 +130,48 @@ class WindowManager(object):
         self.screen = Wnck.Screen.get(self.gdk_screen.get_number())
 
         self.usable_region = UsableRegion()
+
+        #: Strut reservations by X11 window ID, with :any:`None` for windows
+        #: that don't reserve any space.
+        self._struts = {}  # type: Dict[int, Optional[StrutPartial]]
+        self._client_list = []  # type: List[int]
+        self._panels = []  # type: List[StrutPartial]
+        self._last_full_scan = None  # type: Optional[float]
+
+        # Cached by _get_workareas. (None if it needs to be re-read)
+        self._workarea_hints = None  # type: Optional[List[Rectangle]]
+        self._workarea_atoms = set()  # type: Set[int]
+
+        #: Set by :meth:`watch_struts` once ``PropertyNotify`` events are
+        #: being delivered to :meth:`handle_xevent` and ``_struts`` can be
+        #: trusted to be current without rescanning it.
+        self.watching_struts = False
+
+        # Used to quietly discard errors caused by clients which have
+        # gone away between us learning of them and acting on that knowledge
+        self._catch_badwindow = CatchError(BadWindow)
+
+        # In-memory copies of _QUICKTILE_CYCLE_POS, the windows whose copies
+        # haven't been written back yet, and how many PropertyNotify events
+        # for it are our own writes echoing back to us.
+        self._cycle_pos = {}  # type: Dict[int, Optional[Tuple[int, int]]]
+        self._cycle_pos_dirty = set()  # type: Set[int]
+        self._cycle_pos_echoes = {}  # type: Dict[int, int]
+        self._cycle_pos_timer = None  # type: Optional[int]
+
+        # _NET_FRAME_EXTENTS for client windows, kept while watching_struts
+        self._frame_extents = {}  # type: Dict[int, Tuple[int, int, int, int]]
+
+        # Nesting depth of open transaction() blocks and X errors which have
+        # yet to be reported by _flush()
+        self._transaction_depth = 0
+        self._x_errors = []  # type: List[Tuple[Any, Any]]
+
+        self._atoms = {}  # type: Dict[str, int]
+        self.intern_atoms(ATOMS)
+
         self.update_geometry_cache()
         # TODO: Hook monitor-added and monitor-removed and regenerate this
-        # TODO: Hook changes to strut reservations and regenerate this
 
     def update_geometry_cache(self):
         """Update the internal cache of monitor & panel shapes by querying
@@ -136,56 +210,313 @@ class WindowManager(object):
             else:
                 raise Exception("Could not retrieve desktop geometry")
 
-        # Gather all struts
-        struts = []
-        for wid in [self.x_root.id] + list(self.get_property(
-                self.x_root.id, '_NET_CLIENT_LIST', Xatom.WINDOW, [])):
-            win = self.x_display.create_resource_object('window', wid)
-            result = self.get_property(
-                win, '_NET_WM_STRUT_PARTIAL', Xatom.CARDINAL)
-            if result:
-                struts.append(StrutPartial(*result))
-                logging.debug("Gathered _NET_WM_STRUT_PARTIAL value: %s",
-                              struts)
-            else:
-                # TODO: Unit test this fallback
-                result = self.get_property(
-                    win, '_NET_WM_STRUT', Xatom.CARDINAL)
-                if result:
-                    struts.append(StrutPartial(*result))
-                    logging.debug("Gathered _NET_WM_STRUT value: %s", struts)
-
-        # Get the list of struts from the root window
-        self.usable_region.set_panels(struts)
+        # Prefer the window manager's own idea of the usable region
+        workareas = self._get_workareas() if self.use_workarea_hints else None
+        if self.usable_region.set_workareas(workareas):
+            logging.debug("Using work areas published by the window manager:"
+                          " %r", workareas)
+            return
+
+        # Gather all struts (unless PropertyNotify is keeping them current)
+        if not self.watching_struts:
+            self._scan_struts()
+        self._apply_struts()
+
+    def _get_workareas(self) -> List[Rectangle]:
+        """Retrieve the usable region as published by the window manager.
+
+        This will use the per-monitor ``_GTK_WORKAREAS_D<n>`` property
+        published by Mutter and other GTK-aligned window managers if present
+        and fall back to the single per-desktop ``_NET_WORKAREA`` rectangle
+        otherwise.
+
+        :returns: A list of work area rectangles, which may be empty.
+        """
+        if self.watching_struts and self._workarea_hints is not None:
+            return self._workarea_hints
+
+        desktop = self.get_property(self.x_root.id, '_NET_CURRENT_DESKTOP',
+                                    Xatom.CARDINAL, [0])[0]
+        gtk_name = '_GTK_WORKAREAS_D%d' % desktop
+        self._workarea_atoms = set(self.get_atom(x) for x in
+            (gtk_name, '_NET_WORKAREA', '_NET_CURRENT_DESKTOP'))
+
+        values = self.get_property(
+            self.x_root.id, gtk_name, Xatom.CARDINAL, [])
+        if not values:
+            values = self.get_property(self.x_root.id, '_NET_WORKAREA',
+                Xatom.CARDINAL, [])[desktop * 4:(desktop + 1) * 4]
+
+        self._workarea_hints = [Rectangle.from_xywh(*values[pos:pos + 4])
+                                for pos in range(0, len(values) - 3, 4)]
+        logging.debug("Gathered work area hints: %r", self._workarea_hints)
+        return self._workarea_hints
+
+    def _get_struts(self, wids: List[int]) -> List[Optional[StrutPartial]]:
+        """Retrieve the panel reservations for a list of windows.
+
+        :param wids: The X11 window IDs to query.
+        :returns: A list, in the same order as ``wids``, containing a
+            :class:`quicktile.util.StrutPartial` or :any:`None` if the window
+            reserves no space or no longer exists.
+        """
+        results = self.get_properties(
+            wids, '_NET_WM_STRUT_PARTIAL', Xatom.CARDINAL)
+        logging.debug("Gathered _NET_WM_STRUT_PARTIAL values: %s", results)
+
+        fallback = [wid for wid, result in zip(wids, results) if not result]
+        if fallback:
+            fallback_results = dict(zip(fallback, self.get_properties(
+                fallback, '_NET_WM_STRUT', Xatom.CARDINAL)))
+            logging.debug("Gathered _NET_WM_STRUT values: %s",
+                          fallback_results)
+            results = [result or fallback_results[wid]
+                       for wid, result in zip(wids, results)]
+
+        return [StrutPartial(*x) if x else None for x in results]
+
+    def _scan_struts(self):
+        """Refresh the strut cache by querying the desktop
+
+        This will query every client window if :attr:`strut_scan_interval`
+        has elapsed since the last full scan, and only likely panels
+        otherwise.
+        """
+        self._client_list = list(self.get_property(
+            self.x_root.id, '_NET_CLIENT_LIST', Xatom.WINDOW, []))
+        wids = [self.x_root.id] + self._client_list
+
+        now = time.time()
+        if (self._last_full_scan is None or
+                now - self._last_full_scan >= self.strut_scan_interval):
+            self._struts = dict(zip(wids, self._get_struts(wids)))
+            self._last_full_scan = now
+            return
+
+        # Otherwise, only ask windows which are likely to be panels
+        candidates = set(wid for wid, strut in self._struts.items() if strut)
+        candidates.update(win.get_xid() for win in self.screen.get_windows()
+            if win.get_window_type() == Wnck.WindowType.DOCK)
+        candidates.add(self.x_root.id)
+
+        # Merge so windows which weren't asked keep their entries (and stay
+        # eligible for PropertyNotify refetches), dropping only the departed
+        current = set(wids)
+        for wid in set(self._struts).difference(current):
+            del self._struts[wid]
+        wids = [x for x in wids if x in candidates]
+        self._struts.update(zip(wids, self._get_struts(wids)))
+
+    def _apply_struts(self):
+        """Feed the cached struts to :attr:`usable_region` if they changed
+        since the last time this was called.
+        """
+        panels = [self._struts[wid] for wid in
+                  [self.x_root.id] + self._client_list
+                  if self._struts.get(wid)]
+        if panels == self._panels:
+            return
+
+        self._panels = panels
+        self.usable_region.set_panels(panels)
         logging.debug("Usable desktop region calculated as: %s",
             self.usable_region)
-        return
 
-    def get_monitor(self, win: Wnck.Window) -> Tuple[int, Rectangle]:
+    def _watch_window(self, wid: int, event_mask: int=X.PropertyChangeMask):
+        """Ask the X server to send us ``PropertyNotify`` events for a window.
+
+        :param wid: The X11 window ID to watch.
+        :param event_mask: The event mask to request.
+        """
+        win = self.x_display.create_resource_object('window', wid)
+        win.change_attributes(event_mask=event_mask,
+                              onerror=self._catch_badwindow)
+
+    def watch_struts(self):
+        """Subscribe to changes in panel reservations so that
+        :meth:`update_geometry_cache` can stop rescanning every client window.
+
+        This must only be called once something is feeding the resulting
+        events to :meth:`handle_xevent`, since the strut cache will otherwise
+        go stale.
+        """
+        # Preserve whatever other events were already requested on the root
+        root_mask = self.x_root.get_attributes().your_event_mask
+        self._watch_window(self.x_root.id,
+                           root_mask | X.PropertyChangeMask)
+
+        # Subscribe before querying so no changes can slip through the cracks
+        for wid in self.get_property(
+                self.x_root.id, '_NET_CLIENT_LIST', Xatom.WINDOW, []):
+            self._watch_window(wid)
+        self._last_full_scan = None  # Force a full scan to seed the cache
+        self._scan_struts()
+        self._apply_struts()
+
+        self.watching_struts = True
+
+    def handle_xevent(self, xevent: Any):
+        """Keep cached state current in response to X events.
+
+        :param xevent: An event retrieved from :attr:`x_display`. Events which
+            aren't relevant to the caches are ignored.
+        """
+        if xevent.type != X.PropertyNotify or not self.watching_struts:
+            return
+
+        wid = xevent.window.id
+
+        if (wid == self.x_root.id and
+                xevent.atom == self.get_atom('_NET_CLIENT_LIST')):
+            client_list = list(self.get_property(
+                self.x_root.id, '_NET_CLIENT_LIST', Xatom.WINDOW, []))
+            known = set(self._client_list)
+            new_wids = [x for x in client_list if x not in known]
+            for new_wid in new_wids:
+                self._watch_window(new_wid)
+            self._struts.update(zip(new_wids, self._get_struts(new_wids)))
+            for old_wid in known.difference(client_list):
+                self._struts.pop(old_wid, None)
+                self._cycle_pos.pop(old_wid, None)
+                self._cycle_pos_dirty.discard(old_wid)
+                self._cycle_pos_echoes.pop(old_wid, None)
+                self._frame_extents.pop(old_wid, None)
+            self._client_list = client_list
+        elif xevent.atom == self.get_atom('_NET_FRAME_EXTENTS'):
+            self._frame_extents.pop(wid, None)
+            return
+        elif xevent.atom == self.get_atom('_QUICKTILE_CYCLE_POS'):
+            # Forget cached positions changed by other QuickTile processes
+            # (eg. one-shot command-line invocations)
+            if self._cycle_pos_echoes.get(wid):
+                self._cycle_pos_echoes[wid] -= 1
+            elif wid not in self._cycle_pos_dirty:
+                self._cycle_pos.pop(wid, None)
+            return
+        elif ((wid == self.x_root.id or wid in self._client_list) and
+                xevent.atom in [self.get_atom(x) for x in STRUT_ATOMS]):
+            self._struts[wid] = self._get_struts([wid])[0]
+        elif wid == self.x_root.id and xevent.atom in self._workarea_atoms:
+            self._workarea_hints = None
+            return
+        else:
+            return
+
+        self._apply_struts()
+
+    def get_cycle_pos(self, win: Wnck.Window) -> Optional[Tuple[int, int]]:
+        """Retrieve the position last recorded by :meth:`set_cycle_pos`.
+
+        While :attr:`watching_struts` is set, this only queries the
+        ``_QUICKTILE_CYCLE_POS`` property the first time it's asked about a
+        given window and is answered from memory after that.
+
+        :param win: The window to look up the position for.
+        :returns: ``(cmd_idx, pos)`` or :any:`None` if no valid position was
+            recorded.
+        """
+        wid = win.get_xid()
+        if wid in self._cycle_pos:
+            return self._cycle_pos[wid]
+
+        try:
+            cmd_idx, pos = self.get_property(wid, '_QUICKTILE_CYCLE_POS',
+                                             Xatom.INTEGER)
+        except (ValueError, TypeError):  # TODO: Is TypeError still possible?
+            result = None  # type: Optional[Tuple[int, int]]
+        else:
+            result = (cmd_idx, pos)
+
+        if self.watching_struts and wid in self._client_list:
+            self._cycle_pos[wid] = result
+        return result
+
+    def set_cycle_pos(self, win: Wnck.Window, cmd_idx: int, pos: int):
+        """Record a window's position in a sequence of tiling presets.
+
+        This is stored in the ``_QUICKTILE_CYCLE_POS`` property so that it
+        persists across QuickTile invocations. While :attr:`watching_struts`
+        is set, it is written back :attr:`cycle_pos_write_delay` milliseconds
+        later (or by :meth:`flush_cycle_pos`) rather than immediately.
+
+        :param win: The window to record the position for.
+        :param cmd_idx: The ``cmd_idx`` of the command which was invoked.
+        :param pos: The window's position in that command's sequence.
+        """
+        wid = win.get_xid()
+        if not (self.watching_struts and wid in self._client_list):
+            self.set_property(wid, '_QUICKTILE_CYCLE_POS', [cmd_idx, pos],
+                prop_type=Xatom.INTEGER, format_size=32)
+            return
+
+        self._cycle_pos[wid] = (cmd_idx, pos)
+        self._cycle_pos_dirty.add(wid)
+        if self._cycle_pos_timer is None:
+            self._cycle_pos_timer = GLib.timeout_add(
+                self.cycle_pos_write_delay, self._cb_flush_cycle_pos)
+
+    def flush_cycle_pos(self):
+        """Write any positions :meth:`set_cycle_pos` has yet to store in
+        ``_QUICKTILE_CYCLE_POS`` back to the X server immediately.
+        """
+        if self._cycle_pos_timer is not None:
+            GLib.source_remove(self._cycle_pos_timer)
+            self._cycle_pos_timer = None
+        self._write_cycle_pos()
+
+    def _cb_flush_cycle_pos(self) -> bool:
+        """:func:`GLib.timeout_add` callback for :meth:`set_cycle_pos`"""
+        self._cycle_pos_timer = None
+        self._write_cycle_pos()
+        return False
+
+    def _write_cycle_pos(self):
+        """Write out all pending positions with a single flush"""
+        if not self._cycle_pos_dirty:
+            return
+
+        atom = self.get_atom('_QUICKTILE_CYCLE_POS')
+        for wid in self._cycle_pos_dirty:
+            value = self._cycle_pos.get(wid)
+            if value is None:
+                continue
+
+            win = self.x_display.create_resource_object('window', wid)
+            win.change_property(atom, Xatom.INTEGER, 32, list(value),
+                                onerror=self._catch_badwindow)
+            self._cycle_pos_echoes[wid] = (
+                self._cycle_pos_echoes.get(wid, 0) + 1)
+
+        logging.debug("Wrote back cycle positions for %d windows",
+                      len(self._cycle_pos_dirty))
+        self._cycle_pos_dirty.clear()
+        self._flush()
+
+    def get_monitor(self, win: Union[Gdk.Window, Wnck.Window]
+                    ) -> Tuple[int, Rectangle]:
         """Given a window, retrieve the ID and geometry of the monitor it's on.
 
+        This is resolved from the monitor geometry cached in
+        :attr:`usable_region` using the same rules as
+        :meth:`quicktile.util.Rectangle.closest_of`, so it requires no
+        round-trips to the X server.
+
         :param win: The window to find the containing monitor for.
         :returns: ``(monitor_id, geometry)``
-
-        .. todo:: Look for a way to get the monitor ID without having to
-           instantiate a :class:`Gdk.Window`.
-
-           Doing so would also remove the need to set ``self.gdk_display`` as
-           this is the only user of it.
         """
-        if not isinstance(win, Gdk.Window):
-            win = GdkX11.X11Window.foreign_new_for_display(self.gdk_display,
-                                                           win.get_xid())
+        if isinstance(win, Gdk.Window):
+            win_rect = Rectangle.from_gdk(win.get_frame_extents())
+        else:
+            win_rect = Rectangle.from_xywh(*win.get_geometry())
 
-        # TODO: How do I retrieve the root window from a given one?
-        # (Gdk.Display.get_default_screen().get_root_window()... now why did
-        # I want to know?)
-        monitor_id = self.gdk_screen.get_monitor_at_window(win)
-        monitor_geom = self.gdk_screen.get_monitor_geometry(monitor_id)
+        result = self.usable_region.find_monitor_id_for(win_rect)
+        if result is None:
+            logging.error("No monitors available to contain window %r", win)
+            return 0, Rectangle(0, 0, 0, 0)
 
         logging.debug(" Window is on monitor %s, which has geometry %s",
-                      monitor_id, Rectangle.from_gdk(monitor_geom))
-        return monitor_id, monitor_geom
+                      *result)
+        return result
 
     def get_relevant_windows(self, workspace: Wnck.Workspace
                              ) -> Iterable[Wnck.Window]:
@@ -208,7 +539,7 @@ class WindowManager(object):
 
     def get_workspace(self,
                 window: Wnck.Window=None,
-                direction: Union[Wnck.MotionDirection, int]=None,
+                direction: Union[Wnck.MotionDirection, int, str]=None,
                 wrap_around: bool=True,
                       ) -> Optional[Wnck.Workspace]:
         """Get a workspace (virtual desktop) relative to the one containing
@@ -221,6 +552,8 @@ class WindowManager(object):
 
             - :any:`Wnck.MotionDirection`: Absolute direction (will not cycle
               around when it reaches the edge)
+            - :any:`str`: The name of a :any:`Wnck.MotionDirection` member
+              (eg. ``'UP'``), for callers which mustn't import Wnck themselves
             - :any:`int`: Relative position in the list of workspaces (eg.
               ``1`` or ``-2``).
             - :any:`None`: The workspace containing ``window``
@@ -235,6 +568,9 @@ class WindowManager(object):
         if not cur:
             return None  # It's either pinned or on no workspaces
 
+        if isinstance(direction, str):
+            direction = getattr(Wnck.MotionDirection, direction, direction)
+
         if isinstance(direction, Wnck.MotionDirection):
             nxt = cur.get_neighbor(direction)
         elif isinstance(direction, int):
@@ -252,6 +588,34 @@ class WindowManager(object):
 
         return nxt
 
+    def intern_atoms(self, names: Iterable[str]):
+        """Resolve a set of atom names to their IDs and cache the results.
+
+        All ``InternAtom`` requests are sent before waiting for any of the
+        replies so that the whole batch costs a single round-trip.
+
+        :param names: The atom names to intern.
+        """
+        pending = [(name, xrequest.InternAtom(
+            display=self.x_display.display, defer=True,
+            name=name, only_if_exists=False))
+            for name in names if name not in self._atoms]
+
+        for name, req in pending:
+            req.reply()
+            self._atoms[name] = req.atom
+
+    def get_atom(self, name: str) -> int:
+        """Look up the ID for an atom name, interning it if it isn't already
+        in the table built by :meth:`intern_atoms`.
+
+        :param name: The atom name to resolve.
+        """
+        atom = self._atoms.get(name)
+        if atom is None:
+            atom = self._atoms[name] = self.x_display.get_atom(name)
+        return atom
+
     def _property_prep(self,
             win: Union[Gdk.Window, Wnck.Window, int],
             name: Union[str, int]):
@@ -267,7 +631,7 @@ class WindowManager(object):
         if isinstance(win, int):
             win = self.x_display.create_resource_object('window', win)
         if isinstance(name, str):
-            name = self.x_display.get_atom(name)
+            name = self.get_atom(name)
         return win, name
 
     # pylint: disable=line-too-long
@@ -307,6 +671,72 @@ class WindowManager(object):
         return result.value if result else empty
         # TODO: Verify that python-xlib will call XFree for us when appropriate
 
+    def get_properties(self,
+            wins: Iterable[Union[Gdk.Window, Wnck.Window, int]],
+            name: Union[str, int],
+            prop_type: int,
+            empty: Any=None,
+            sizehint: int=64) -> List[Any]:
+        """Get the value of the X11 property ``name`` on many windows at once
+
+        This is equivalent to calling :meth:`get_property` for each window in
+        ``wins``, except that all of the ``GetProperty`` requests are sent
+        before waiting for any of the replies, so the whole batch only costs a
+        single round-trip to the X server rather than one per window.
+
+        :param wins: GTK or Wnck Window objects or raw X11 window IDs.
+        :param name: An atom name or a handle returned by
+            :meth:`Xlib.display.Display.create_resource_object`.
+        :param prop_type: A constant from :mod:`Xlib.Xatom`
+        :param empty: The value to return for windows where the property is
+            unset or which were destroyed before the request was processed.
+        :param sizehint: How many 32-bit words to ask for in the initial
+            request. Values longer than this will require another round-trip
+            to retrieve the remainder.
+        :returns: A list of values in the same order as ``wins``.
+        """
+        if isinstance(name, str):
+            name = self.get_atom(name)
+
+        pending = []
+        for win in wins:
+            win, _ = self._property_prep(win, name)
+            pending.append((win, xrequest.GetProperty(
+                display=self.x_display.display, defer=True,
+                delete=False, window=win.id, property=name, type=prop_type,
+                long_offset=0, long_length=sizehint)))
+
+        results = []
+        for win, req in pending:
+            try:
+                req.reply()
+            except BadWindow:
+                logging.debug("Window vanished before property could be "
+                              "retrieved: %s", win.id)
+                results.append(empty)
+                continue
+
+            if not req.property_type:
+                results.append(empty)
+                continue
+
+            value = req.value[1]
+            if req.bytes_after:
+                # The property or window may be gone by the time we ask again
+                try:
+                    rest = win.get_property(
+                        name, prop_type, sizehint, req.bytes_after // 4 + 1)
+                except BadWindow:
+                    rest = None
+                if rest is None:
+                    logging.debug("Property vanished before the remainder "
+                                  "could be retrieved: %s", win.id)
+                    results.append(empty)
+                    continue
+                value = value + rest.value
+            results.append(value)
+        return results
+
     def set_property(self,  # pylint: disable=too-many-arguments
             win: Union[Gdk.Window, Wnck.Window, int],
             name: Union[str, int],
@@ -347,9 +777,54 @@ class WindowManager(object):
         .. _XChangeProperty: https://tronche.com/gui/x/xlib/window-information/XChangeProperty.html
         """  # NOQA pylint: disable=line-too-long
         win, name = self._property_prep(win, name)
-        win.change_property(name, prop_type, format_size, value)
-        self.x_display.flush()
-        # TODO: Set an `onerror` handler and at least log an error to console
+        win.change_property(name, prop_type, format_size, value,
+                            onerror=self._record_x_error)
+        self._flush()
+
+    @contextmanager
+    def transaction(self, sync: bool=False):
+        """Context manager to send all X requests made within it together.
+
+        Inside a transaction, methods like :meth:`set_property` and
+        :meth:`reposition` queue their requests rather than flushing them
+        individually. When the outermost transaction ends, both the
+        python-xlib and GDK connections are flushed once and any X errors
+        received in response to requests made through this class are logged.
+
+        Transactions may be nested. Only the outermost one has any effect.
+
+        :param sync: If :any:`True`, wait for the X server to process the
+            requests before returning, so that all errors they cause will be
+            reported, rather than only the ones which have already arrived.
+        """
+        self._transaction_depth += 1
+        try:
+            yield
+        finally:
+            self._transaction_depth -= 1
+            self._flush(sync)
+
+    def _flush(self, sync: bool=False):
+        """Flush queued requests and report X errors unless a
+        :meth:`transaction` is still open."""
+        if self._transaction_depth:
+            return
+
+        if sync:
+            self.x_display.sync()
+        else:
+            self.x_display.flush()
+        self.gdk_display.flush()
+
+        errors, self._x_errors = self._x_errors, []
+        for error, request in errors:
+            logging.error("X server returned an error for %r: %s",
+                          request, error)
+
+    def _record_x_error(self, error: Any, request: Any):
+        """python-xlib ``onerror`` handler which queues errors for
+        :meth:`_flush` to report"""
+        self._x_errors.append((error, request))
 
     # XXX: Move `if not window` into a decorator and use it everywhere?
     @staticmethod
@@ -373,6 +848,151 @@ class WindowManager(object):
 
         return True
 
+    @contextmanager
+    def persist_maximization(self, wins: Iterable[Wnck.Window],
+                             keep_maximize: bool=True):
+        """Context manager to persist maximization state across calls to
+        :meth:`set_geometry`.
+
+        The ``_NET_WM_STATE`` of every window is read in a single round-trip
+        and each maximized window is un-maximized (and, on exit, re-maximized)
+        with one client message for both axes rather than going through Wnck
+        once per axis.
+
+        :param wins: The windows to operate on.
+        :param keep_maximize: If :any:`False`, windows will be left
+            un-maximized on exit.
+        """
+        wids = [win.get_xid() for win in wins]
+        max_atoms = [self.get_atom(x) for x in MAXIMIZED_ATOMS]
+
+        # Unmaximize and record the types we may need to restore
+        maxed = []
+        for wid, wm_state in zip(wids, self.get_properties(
+                wids, '_NET_WM_STATE', Xatom.ATOM, [])):
+            atoms = [x for x in max_atoms if x in wm_state]
+            if atoms:
+                maxed.append((wid, atoms))
+                self._send_wm_state(wid, NET_WM_STATE_REMOVE, atoms)
+
+        # Wnck requests go through GDK's connection, so make sure the window
+        # manager sees our un-maximize first, even inside a transaction.
+        if maxed:
+            self.x_display.flush()
+
+        yield
+
+        # Restore maximization if asked
+        if maxed and keep_maximize:
+            self.gdk_display.flush()
+            for wid, atoms in maxed:
+                self._send_wm_state(wid, NET_WM_STATE_ADD, atoms)
+            self._flush()
+
+    def _send_wm_state(self, wid: int, action: int, atoms: Sequence[int]):
+        """Ask the window manager to change up to two ``_NET_WM_STATE`` atoms
+        on a window with a single client message.
+
+        :param wid: The X11 window ID to operate on.
+        :param action: :any:`NET_WM_STATE_REMOVE` or :any:`NET_WM_STATE_ADD`
+        :param atoms: One or two ``_NET_WM_STATE_*`` atoms
+        """
+        data = [action] + list(atoms) + [0] * (2 - len(atoms))
+        self.x_root.send_event(xevent.ClientMessage(
+            window=wid, client_type=self.get_atom('_NET_WM_STATE'),
+            data=(32, data + [SOURCE_PAGER, 0])),
+            event_mask=X.SubstructureRedirectMask | X.SubstructureNotifyMask,
+            onerror=self._record_x_error)
+
+    def get_frame_extents(self, win: Union[Wnck.Window, int]
+                          ) -> Tuple[int, int, int, int]:
+        """Retrieve the size of the decorations the window manager has put
+        around a window from ``_NET_FRAME_EXTENTS``.
+
+        While :attr:`watching_struts` is set, the value is cached for each
+        managed window until a ``PropertyNotify`` reports that it changed.
+
+        :param win: A Wnck Window object or a raw X11 window ID.
+        :returns: ``(left, right, top, bottom)``, which will be all zeroes if
+            the window manager hasn't set them.
+        """
+        wid = win if isinstance(win, int) else win.get_xid()
+        extents = self._frame_extents.get(wid)
+        if extents is not None:
+            return extents
+
+        value = self.get_property(wid, '_NET_FRAME_EXTENTS',
+                                  Xatom.CARDINAL, [])
+        if len(value) == 4:
+            extents = tuple(value)  # type: ignore
+        else:
+            extents = (0, 0, 0, 0)
+
+        if self.watching_struts and wid in self._client_list:
+            self._frame_extents[wid] = extents
+        return extents
+
+    def frame_to_client(self, win: Union[Wnck.Window, int], rect: Rectangle
+                        ) -> Rectangle:
+        """Convert geometry which includes a window's decorations into the
+        geometry of its client area.
+
+        :param win: A Wnck Window object or a raw X11 window ID.
+        :param rect: Geometry including the window manager's frame.
+        """
+        left, right, top, bottom = self.get_frame_extents(win)
+        return Rectangle.from_xywh(rect.x + left, rect.y + top,
+                                   max(1, rect.width - left - right),
+                                   max(1, rect.height - top - bottom))
+
+    def client_to_frame(self, win: Union[Wnck.Window, int], rect: Rectangle
+                        ) -> Rectangle:
+        """Inverse of :meth:`frame_to_client`
+
+        :param win: A Wnck Window object or a raw X11 window ID.
+        :param rect: Geometry of the window's client area.
+        """
+        left, right, top, bottom = self.get_frame_extents(win)
+        return Rectangle.from_xywh(rect.x - left, rect.y - top,
+                                   rect.width + left + right,
+                                   rect.height + top + bottom)
+
+    def set_geometry(self, win: Wnck.Window, geom: Rectangle,
+            geometry_mask: Wnck.WindowMoveResizeMask=(
+                Wnck.WindowMoveResizeMask.X |
+                Wnck.WindowMoveResizeMask.Y |
+                Wnck.WindowMoveResizeMask.WIDTH |
+                Wnck.WindowMoveResizeMask.HEIGHT)):
+        """Move and resize a window, decorations inclusive, using the
+        :attr:`moveresize_backend` backend.
+
+        Unlike :meth:`reposition`, this performs no clipping and doesn't
+        un-maximize the window.
+
+        :param win: The window to move.
+        :param geom: The desktop-relative geometry for the window's frame.
+        :param geometry_mask: A set of flags determining which aspects of
+            ``geom`` should actually be applied to the window.
+        """
+        if self.moveresize_backend != 'xlib':
+            # Always use STATIC because either WMs implement window gravity
+            # incorrectly or it's not applicable to this problem
+            win.set_geometry(Wnck.WindowGravity.STATIC, geometry_mask, *geom)
+            return
+
+        # With static gravity, _NET_MOVERESIZE_WINDOW positions the client
+        # area, so convert from frame to client coordinates like Wnck does.
+        wid = win.get_xid()
+        client = self.frame_to_client(wid, geom)
+        self.x_root.send_event(xevent.ClientMessage(
+            window=wid, client_type=self.get_atom('_NET_MOVERESIZE_WINDOW'),
+            data=(32, [
+                X.StaticGravity | int(geometry_mask) << 8 | SOURCE_PAGER << 12,
+            ] + list(client))),
+            event_mask=X.SubstructureRedirectMask | X.SubstructureNotifyMask,
+            onerror=self._record_x_error)
+        self._flush()
+
     def reposition(self,  # pylint: disable=too-many-arguments
             win: Wnck.Window,
             geom: Optional[Rectangle]=None,
@@ -412,7 +1032,7 @@ class WindowManager(object):
             a sequence of differently sized monitors.
         """
 
-        old_geom = Rectangle(*win.get_geometry()).to_relative(
+        old_geom = Rectangle.from_xywh(*win.get_geometry()).to_relative(
             self.get_monitor(win)[1])
 
         new_args = {}
@@ -436,10 +1056,58 @@ class WindowManager(object):
 
         if bool(clipped_geom):
             logging.debug(" Repositioning to %s)\n", clipped_geom)
-            with persist_maximization(win, keep_maximize):
-                # Always use STATIC because either WMs implement window gravity
-                # incorrectly or it's not applicable to this problem
-                win.set_geometry(Wnck.WindowGravity.STATIC,
-                                 geometry_mask, *clipped_geom)
+            with self.persist_maximization([win], keep_maximize):
+                self.set_geometry(win, clipped_geom, geometry_mask)
         else:
             logging.debug(" Geometry clipping failed: %r", clipped_geom)
+
+    def reposition_many(self,
+            targets: Iterable[Tuple[Wnck.Window, Rectangle]],
+            keep_maximize: bool=False) -> None:
+        """Move several windows to other monitors at once.
+
+        This is the batch equivalent to calling :meth:`reposition` with no
+        ``geom`` for each window: every window keeps its position relative to
+        the monitor it's currently on and is then clipped to the usable region
+        of its destination.
+
+        All geometry is read and resolved in a single pass, every window is
+        un-maximized before any of them are moved, and all of the requests are
+        flushed to the X server together at the end (or when the enclosing
+        :meth:`transaction` ends).
+
+        :param targets: ``(window, monitor)`` pairs, where ``monitor`` is the
+            geometry of the monitor the window should be moved to.
+        :param keep_maximize: Whether to re-maximize windows which had to be
+            un-maximized to ensure they would move.
+        """
+        pairs = list(targets)  # type: Sequence[Tuple[Wnck.Window, Rectangle]]
+        if not pairs:
+            return
+
+        geoms = RectangleArray(Rectangle.from_xywh(*win.get_geometry())
+                               for win, _ in pairs)
+        old_monitors = self.usable_region.find_monitor_ids_for(geoms)
+        if not old_monitors:
+            logging.error("No monitors available to contain windows")
+            return
+
+        new_geoms = geoms.to_relative(
+            RectangleArray(mon for _, mon in old_monitors)).from_relative(
+            RectangleArray(mon for _, mon in pairs))
+
+        moves = []
+        for (win, _), new_geom in zip(pairs, new_geoms):
+            clipped_geom = self.usable_region.clip_to_usable_region(new_geom)
+            if clipped_geom:
+                moves.append((win, clipped_geom))
+            else:
+                logging.debug(" Geometry clipping failed for %r: %r",
+                              win, clipped_geom)
+
+        logging.debug(" Repositioning %d windows", len(moves))
+        with self.persist_maximization((win for win, _ in moves),
+                                       keep_maximize):
+            for win, geom in moves:
+                self.set_geometry(win, geom)
+        self._flush()
@@ -9,23 +9,182 @@ __license__ = "GNU GPL 2.0 or later"
 
 # TODO: I need a functional test to make sure issue #25 doesn't regress
 
-import logging, unittest
+import logging, os, random, subprocess, sys, tempfile, unittest
+from contextlib import contextmanager
 
-# from quicktile import commands
+from quicktile import commands
+from quicktile.layout import PresetTable
 from quicktile.util import (clamp_idx, euclidean_dist, powerset, Edge, Gravity,
-                            Rectangle, StrutPartial, UsableRegion, XInitError)
+                            Rectangle, RectangleArray, StrutPartial,
+                            UsableRegion, XInitError)
 
 # Ensure code coverage counts modules not yet imported by tests.
 from quicktile import __main__  # NOQA pylint: disable=unused-import
 
+# -- Type-Annotation Imports --
+from typing import Any, Dict, List, Tuple  # NOQA pylint: disable=W0611
+# --
+
 log = logging.getLogger(__name__)
 
-# class TestCommandRegistry(unittest.TestCase):
-#     """Tests for the `CommandRegistry` class"""
-#     def setUp(self):  # type: () -> None
-#         self.registry = commands.CommandRegistry()
-#
-#     # TODO: Implement tests for CommandRegistry
+#: Packages the command-line front-end mustn't load until it needs them
+HEAVY_MODULES = ('gi', 'Xlib', 'dbus', 'quicktile.gtkexcepthook',
+                 'quicktile.keybinder', 'quicktile.wm')
+
+#: How many microseconds importing the front-end may take
+#: (Generous, since it's meant to catch GTK+ sneaking back in, not jitter)
+IMPORT_BUDGET_US = 250000
+
+
+class DummyWinMan(object):  # pylint: disable=too-few-public-methods
+    """A WindowManager that can't be used for anything"""
+    def __init__(self):
+        self.transactions = 0
+
+    @contextmanager
+    def transaction(self):
+        """Count how many commands were run"""
+        self.transactions += 1
+        yield
+
+
+class TestCommandRegistry(unittest.TestCase):
+    """Tests for the `CommandRegistry` class"""
+    def setUp(self):  # type: () -> None
+        self.registry = commands.CommandRegistry()
+        self.registry.extra_state = {'config': 'dummy'}
+        self.calls = []  # type: List[Tuple[Dict[str, Any], Tuple, Dict]]
+
+        # pylint: disable=unused-argument
+        @self.registry.add('noop', 'a', windowless=True, kw=1)
+        @self.registry.add_many({'first': [1], 'second': [2]})
+        def noop(winman, win, state, *args, **kwargs):
+            """Record how we were called"""
+            self.calls.append((state, args, kwargs))
+
+    def test_prepare(self):
+        """CommandRegistry: prepare resolves arguments and static state"""
+        prepared = self.registry.prepare('second', 3, kw=4)
+        self.assertEqual(prepared.args, (2, 3))
+        self.assertEqual(prepared.kwargs, {'kw': 4})
+        self.assertEqual(prepared.state, {
+            'config': 'dummy', 'cmd_name': 'second', 'cmd_idx': 1})
+        self.assertEqual(prepared.needs, commands.NEEDS_ALL)
+
+        self.assertIsNone(self.registry.prepare('no-such-command'))
+
+    def test_call_windowless(self):
+        """CommandRegistry: windowless commands stay windowless"""
+
+        class WinMan(DummyWinMan):  # pylint: disable=too-few-public-methods
+            """Just enough of WindowManager for a windowless command"""
+            class screen(object):  # pylint: disable=invalid-name
+                """Stand-in for Wnck.Screen"""
+                @staticmethod
+                def get_active_window():
+                    """Pretend there's no active window"""
+                    return None
+
+            @staticmethod
+            def update_geometry_cache():
+                """Nothing to update"""
+
+        winman = WinMan()
+        for _ in range(2):
+            self.assertTrue(self.registry.call('noop', winman))
+        self.assertEqual(self.calls, [
+            ({'config': 'dummy', 'cmd_name': 'noop'}, ('a',), {'kw': 1})] * 2)
+        self.assertEqual(winman.transactions, 2)
+        self.assertFalse(self.registry.call('no-such-command', winman))
+
+    def test_repeat(self):
+        """CommandRegistry: repeats are collapsed only when requested"""
+
+        @self.registry.add('repeatable', needs=('repeat',))
+        def record(winman, win, state):  # pylint: disable=unused-argument
+            """Record how we were called"""
+            self.calls.append((state, (), {}))
+
+        class WinMan(DummyWinMan):  # pylint: disable=too-few-public-methods
+            """Just enough of WindowManager for a windowless command"""
+            @staticmethod
+            def update_geometry_cache():
+                """Nothing to update"""
+
+        winman = WinMan()
+        self.registry.prepare('repeatable')(winman, repeat=3)
+        self.assertEqual(self.calls, [
+            ({'cmd_name': 'repeatable', 'repeat': 3}, (), {})])
+
+        # Unrolled repeats are still sent to the X server together
+        self.calls = []
+        self.registry.prepare('noop')(winman, repeat=3)
+        self.assertEqual(len(self.calls), 3)
+        self.assertEqual(winman.transactions, 2)
+
+    def test_index_syntax(self):
+        """CommandRegistry: name@index is only accepted where declared"""
+        @self.registry.add('indexed', 'a', 'b', 'c', needs=('index',))
+        def indexed(winman, win, state, *presets):  # pylint: disable=W0613
+            """Do nothing"""
+
+        self.assertEqual(self.registry.prepare('indexed@2').state,
+                         {'cmd_name': 'indexed', 'index': 2})
+        self.assertIsNone(self.registry.prepare('indexed@two'))
+
+        # The index must select one of the command's presets
+        logging.disable(logging.CRITICAL)
+        try:
+            self.assertIsNone(self.registry.prepare('indexed@3'))
+            self.assertIsNone(self.registry.prepare('indexed@-1'))
+            self.assertFalse(self.registry.call('indexed@3', DummyWinMan()))
+        finally:
+            logging.disable(logging.NOTSET)
+        self.assertIsNone(self.registry.prepare('noop@1'))
+        self.assertIsNone(self.registry.prepare('missing@1'))
+
+    def test_index_mixed_columns(self):
+        """CommandRegistry: @index allows any monitor's stock preset count"""
+        presets = PresetTable([3, 4])
+        self.registry.extra_state = {'config': 'dummy', 'presets': presets}
+
+        @self.registry.add_many(presets.default_layout,
+                                needs=('config', 'index'))
+        def indexed(winman, win, state, *presets):  # pylint: disable=W0613
+            """Do nothing"""
+
+        # Monitor 0 has three 'left' presets but monitor 1 has four
+        self.assertEqual(len(presets.default_layout['left']), 3)
+        self.assertEqual(self.registry.prepare('left@3').state['index'], 3)
+
+        logging.disable(logging.CRITICAL)
+        try:
+            self.assertIsNone(self.registry.prepare('left@4'))
+        finally:
+            logging.disable(logging.NOTSET)
+
+    def test_needs(self):
+        """CommandRegistry: needs are validated and gathered selectively"""
+        registry = self.registry
+        self.assertEqual(registry.prepare('noop').needs,
+                         frozenset(['usable_region', 'config']))
+
+        self.assertRaises(ValueError, registry.add, 'bad', needs=('bogus',))
+
+        # pylint: disable=unused-argument
+        @registry.add('needs-nothing', needs=())
+        @registry.add('needs-monitor', needs=('monitor',))
+        def record(winman, win, state):
+            """Record how we were called"""
+            self.calls.append((state, (win,), {}))
+
+        self.assertEqual(registry.prepare('needs-monitor').needs,
+                         frozenset(['window', 'monitor', 'usable_region']))
+
+        # Neither the window nor the geometry should have been touched
+        self.assertTrue(registry.call('needs-nothing', DummyWinMan()))
+        self.assertEqual(self.calls, [({'cmd_name': 'needs-nothing'},
+                                       (None,), {})])
 
 # TODO: Implement tests for cycle_dimensions
 # TODO: Implement tests for cycle_monitors
@@ -42,9 +201,658 @@ log = logging.getLogger(__name__)
 
 # TODO: Implement tests for GravityLayout
 
-# TODO: Implement tests for KeyBinder
 
-# TODO: Implement tests for QuickTileApp
+class TestKeyBinder(unittest.TestCase):
+    """Tests for the `KeyBinder` class which don't need an X server"""
+
+    def setUp(self):  # type: () -> None
+        from Xlib import X
+        from quicktile.keybinder import KeyBinder
+
+        # pylint: disable=protected-access
+        self.binder = KeyBinder.__new__(KeyBinder)
+        self.binder._keys = {}
+        self.binder._repeatable = set()
+        self.binder._xevent_handlers = []
+        self.calls = []  # type: List[Tuple[str, int]]
+
+        for name, keycode in (('a', 10), ('b', 11)):
+            self.binder._keys[(keycode, 0)] = (
+                lambda name=name, repeat=1: self.calls.append((name, repeat)))
+        self.binder._repeatable.add((10, 0))
+
+        class DummyEvent(object):  # pylint: disable=R0903
+            """Stand-in for python-xlib events"""
+            def __init__(self, evtype, detail=0, state=0):
+                self.type, self.detail, self.state = evtype, detail, state
+
+        class DummyDisplay(object):
+            """Stand-in for an Xlib display with a queue of events"""
+            def __init__(self, events):
+                self.events = list(events)
+
+            def pending_events(self):
+                """Number of queued events"""
+                return len(self.events)
+
+            def next_event(self):
+                """Pop the next event"""
+                return self.events.pop(0)
+
+        self.press = lambda keycode: DummyEvent(X.KeyPress, keycode)
+        self.release = lambda keycode: DummyEvent(X.KeyRelease, keycode)
+        self.display = DummyDisplay
+
+    def test_repeat_coalescing(self):
+        """KeyBinder: bursts of the same keybind are dispatched together"""
+        press, release = self.press, self.release
+        events = [press(10), release(10), press(10), press(10),
+                  press(11), press(11), press(10)]
+        self.binder.cb_xevent(None, None, self.display(events))
+
+        # Only 'a' was bound as repeatable
+        self.assertEqual(self.calls, [
+            ('a', 3), ('b', 1), ('b', 1), ('a', 1)])
+
+    def test_unbind(self):
+        """KeyBinder: unbind releases every variant of the binding"""
+        from Xlib import X
+
+        # pylint: disable=protected-access
+        ungrabbed = []  # type: List[Tuple[int, int]]
+
+        class DummyRoot(object):  # pylint: disable=R0903
+            """Stand-in for the root window"""
+            @staticmethod
+            def ungrab_key(keycode, modmask):
+                """Record the release"""
+                ungrabbed.append((keycode, modmask))
+
+        binder = self.binder
+        binder.xroot = DummyRoot()
+        binder._ignored_modifiers = [X.Mod2Mask, X.LockMask]
+        binder.parse_accel = lambda accel: (11, X.ControlMask)
+
+        # Simulate having bound <Ctrl>b to the same callback as b
+        variants = list(binder._vary_modmask(X.ControlMask,
+                                             binder._ignored_modifiers))
+        for modmask in variants:
+            binder._keys[(11, modmask)] = binder._keys[(11, 0)]
+            binder._repeatable.add((11, modmask))
+
+        self.assertTrue(binder.unbind('<Ctrl>b'))
+        self.assertEqual(ungrabbed, [(11, x) for x in variants])
+        self.assertEqual(set(binder._keys), {(10, 0)})
+        self.assertEqual(binder._repeatable, {(10, 0)})
+
+
+class TestCommandBindings(unittest.TestCase):
+    """Tests for incrementally updating keybindings"""
+
+    def setUp(self):  # type: () -> None
+        from quicktile.keybinder import CommandBindings
+
+        self.calls = []  # type: List[Tuple[int, str, int]]
+        self.grabs = []  # type: List[Tuple[str, str]]
+        self.callbacks = {}  # type: Dict[str, Any]
+        self.generation = 1
+
+        test = self
+
+        class DummyKeyBinder(object):
+            """Stand-in for KeyBinder which can't grab <Ctrl>taken"""
+            @staticmethod
+            def bind(accel, callback, repeatable=False):
+                """Record the grab"""
+                assert repeatable
+                test.grabs.append(('bind', accel))
+                test.callbacks[accel] = callback
+                return accel != '<Ctrl>taken'
+
+            @staticmethod
+            def unbind(accel):
+                """Record the release"""
+                test.grabs.append(('unbind', accel))
+                test.callbacks.pop(accel, None)
+                return True
+
+        class DummyRegistry(object):  # pylint: disable=R0903
+            """Stand-in for CommandRegistry which records the generation of
+            the config that commands were prepared with"""
+            @staticmethod
+            def prepare(cmd):
+                """Return a callable for every command but 'missing'"""
+                if cmd == 'missing':
+                    return None
+                generation = test.generation
+                return lambda winman, repeat=1: test.calls.append(
+                    (generation, cmd, repeat))
+
+        self.bindings = CommandBindings(DummyKeyBinder(), DummyRegistry(),
+                                        DummyWinMan())
+
+    def update(self, mappings):  # type: (Dict[str, str]) -> None
+        """Call update with logging suppressed and grabs sorted"""
+        self.grabs = []
+        logging.disable(logging.CRITICAL)
+        try:
+            self.bindings.update('<Ctrl>', mappings)
+        finally:
+            logging.disable(logging.NOTSET)
+        self.grabs.sort()
+
+    def test_update(self):
+        """CommandBindings: only changed keys are grabbed or released"""
+        self.update({'a': 'left', 'b': 'right', 'taken': 'top',
+                     'c': 'missing'})
+        self.assertEqual(self.grabs, [
+            ('bind', '<Ctrl>a'), ('bind', '<Ctrl>b'), ('bind', '<Ctrl>taken'),
+            ('unbind', '<Ctrl>taken')])
+        callback_a = self.callbacks['<Ctrl>a']
+        callback_a(repeat=2)
+        self.assertEqual(self.calls, [(1, 'left', 2)])
+
+        # Keys which stay bound are re-prepared but never re-grabbed and
+        # keys which failed to bind are retried
+        self.generation = 2
+        self.update({'a': 'right', 'd': 'left', 'taken': 'top'})
+        self.assertEqual(self.grabs, [
+            ('bind', '<Ctrl>d'), ('bind', '<Ctrl>taken'),
+            ('unbind', '<Ctrl>b'), ('unbind', '<Ctrl>taken')])
+        callback_a()
+        self.assertEqual(self.calls[-1], (2, 'right', 1))
+
+
+class TestClient(unittest.TestCase):
+    """Tests for the helpers used to hand commands off to a daemon"""
+
+    def test_same_display(self):
+        """client: display names are compared without screen numbers"""
+        from quicktile.client import same_display
+        self.assertTrue(same_display(':0', ':0'))
+        self.assertTrue(same_display(':0.0', ':0'))
+        self.assertTrue(same_display('host:10.1', 'host:10'))
+        self.assertFalse(same_display(':0', ':1'))
+        self.assertFalse(same_display(':1', 'host:1'))
+        self.assertFalse(same_display('', ''))
+
+    def test_socket_path(self):
+        """client: the socket path ignores the screen number"""
+        from quicktile.client import socket_path
+        old_env = os.environ.copy()
+        try:
+            os.environ['XDG_RUNTIME_DIR'] = '/run/user/1000'
+            paths = []
+            for display in (':0', ':0.0', ':0.1', ':1'):
+                os.environ['DISPLAY'] = display
+                paths.append(socket_path())
+        finally:
+            os.environ.clear()
+            os.environ.update(old_env)
+
+        self.assertEqual(paths[0], '/run/user/1000/quicktile-:0.sock')
+        self.assertEqual(paths[:3], [paths[0]] * 3)
+        self.assertNotEqual(paths[0], paths[3])
+
+
+class TestControlConnection(unittest.TestCase):
+    """Tests for the control socket protocol"""
+
+    def setUp(self):  # type: () -> None
+        from quicktile.socket_api import ControlConnection
+
+        self.calls = []  # type: List[str]
+
+        class DummyRegistry(object):  # pylint: disable=R0903
+            """Stand-in for CommandRegistry"""
+            @staticmethod
+            def call(command, winman):  # pylint: disable=unused-argument
+                """Record the command and fail on request"""
+                self.calls.append(command)
+                if command == 'broken':
+                    raise RuntimeError("Broken command")
+                return command != 'missing'
+
+        self.conn = ControlConnection(DummyRegistry(), None)
+
+    def test_pipelining(self):
+        """ControlConnection: pipelined commands get one response each"""
+        logging.disable(logging.CRITICAL)
+        try:
+            response = self.conn.feed(b'left\nmissing\n\nbroken\nrig')
+        finally:
+            logging.disable(logging.NOTSET)
+        self.assertEqual(self.calls, ['left', 'missing', 'broken'])
+
+        # Blank lines still get a response so clients can count them
+        self.assertEqual([x.split(' ')[0] for x in
+                          response.decode('utf8').splitlines()],
+                         ['ok', 'unknown', 'error', 'error'])
+
+        # Partial lines wait for the rest or the end of the input
+        self.assertEqual(self.conn.feed(b'ht'), b'')
+        response = self.conn.feed(b'', eof=True).decode('utf8')
+        status, elapsed, command = response.rstrip('\n').split(' ')
+        self.assertEqual((status, command), ('ok', 'right'))
+        self.assertGreaterEqual(float(elapsed), 0)
+
+        # A terminated final line isn't followed by a phantom blank one
+        self.assertEqual(self.conn.feed(b'left\n', eof=True).count(b'\n'), 1)
+
+    def test_line_limit(self):
+        """ControlConnection: overlong lines are rejected"""
+        from quicktile.socket_api import MAX_LINE_LENGTH
+        self.assertRaises(ValueError, self.conn.feed,
+                          b'x' * (MAX_LINE_LENGTH + 1))
+        self.assertEqual(self.calls, [])
+
+
+class TestConfigCache(unittest.TestCase):
+    """Tests for `load_config_cached`"""
+
+    def setUp(self):  # type: () -> None
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cfg_path = os.path.join(self.tmpdir.name, 'quicktile.cfg')
+        self.cache_path = os.path.join(self.tmpdir.name, 'cache', 'cfg.json')
+
+        # Count how often the slow path runs
+        self.loads = 0
+        self.orig_load_config = __main__.load_config
+
+        def load_config(path):
+            """Wrapper to count calls"""
+            self.loads += 1
+            return self.orig_load_config(path)
+        __main__.load_config = load_config
+
+    def tearDown(self):  # type: () -> None
+        __main__.load_config = self.orig_load_config
+        self.tmpdir.cleanup()
+
+    def load(self):  # type: () -> Tuple[Any, PresetTable]
+        """Call load_config_cached with the temporary paths"""
+        logging.disable(logging.INFO)
+        try:
+            return __main__.load_config_cached(self.cfg_path, self.cache_path)
+        finally:
+            logging.disable(logging.NOTSET)
+
+    def test_round_trip(self):
+        """load_config_cached: warm starts match cold ones"""
+        cold_config, cold_presets = self.load()
+        self.assertTrue(os.path.exists(self.cache_path))
+        warm_config, warm_presets = self.load()
+        self.assertEqual(self.loads, 1)
+
+        for section in cold_config.sections():
+            self.assertEqual(dict(warm_config.items(section)),
+                             dict(cold_config.items(section)))
+        self.assertEqual(warm_presets.column_counts,
+                         cold_presets.column_counts)
+        self.assertEqual(warm_presets.layouts, cold_presets.layouts)
+        self.assertEqual(list(warm_presets.default_layout),
+                         list(cold_presets.default_layout))
+
+    def test_reload(self):
+        """QuickTileApp: reloading applies the config to the daemon"""
+        self.load()
+        with open(self.cfg_path) as cfg_file:
+            content = cfg_file.read()
+        with open(self.cfg_path, 'w') as cfg_file:
+            cfg_file.write(content.replace('ColumnCount = 3',
+                'ColumnCount = 2').replace('<Ctrl><Alt>', '<Alt>'))
+
+        updates = []  # type: List[Tuple[str, Dict[str, str]]]
+
+        class DummyBindings(object):  # pylint: disable=R0903
+            """Stand-in for CommandBindings"""
+            @staticmethod
+            def update(modmask, mappings):
+                """Record the update"""
+                updates.append((modmask, mappings))
+
+        registry = commands.CommandRegistry()
+        app = __main__.QuickTileApp(DummyWinMan(), registry, {},
+            config_path=self.cfg_path, cache_path=self.cache_path)
+        app._bindings = DummyBindings()  # pylint: disable=protected-access
+        self.assertFalse(app.reload_config())
+
+        self.assertEqual(registry.extra_state['presets'].column_counts, [2])
+        self.assertEqual(len(registry.prepare('left').args), 2)
+        self.assertEqual(updates[0][0], '<Alt>')
+        self.assertEqual(updates[0][1]['KP_4'], 'left')
+        self.assertEqual(app.winman.moveresize_backend, 'wnck')
+
+    def test_reload_invalid(self):
+        """QuickTileApp: bad values are replaced or leave the daemon alone"""
+        self.load()
+        with open(self.cfg_path) as cfg_file:
+            content = cfg_file.read()
+
+        registry = commands.CommandRegistry()
+        registry.extra_state = {'marker': True}
+        app = __main__.QuickTileApp(DummyWinMan(), registry, {},
+            config_path=self.cfg_path, cache_path=self.cache_path)
+
+        # A bad StrutScanInterval falls back to the default
+        with open(self.cfg_path, 'w') as cfg_file:
+            cfg_file.write(content.replace('StrutScanInterval = 60',
+                                           'StrutScanInterval = soon'))
+        logging.disable(logging.CRITICAL)
+        try:
+            app.reload_config()
+        finally:
+            logging.disable(logging.NOTSET)
+        self.assertEqual(app.winman.strut_scan_interval, 60)
+
+        # A bad ColumnCount leaves everything untouched
+        registry.extra_state = {'marker': True}
+        app.winman.strut_scan_interval = 5
+        for bad_value in ('three', '0', '3,-1'):
+            with open(self.cfg_path, 'w') as cfg_file:
+                cfg_file.write(content.replace(
+                    'ColumnCount = 3', 'ColumnCount = ' + bad_value))
+            logging.disable(logging.CRITICAL)
+            try:
+                self.assertFalse(app.reload_config())
+            finally:
+                logging.disable(logging.NOTSET)
+            self.assertEqual(registry.extra_state, {'marker': True})
+            self.assertEqual(app.winman.strut_scan_interval, 5)
+
+    def test_invalidation(self):
+        """load_config_cached: editing the config or a bad cache reloads"""
+        self.load()
+        with open(self.cfg_path, 'a') as cfg_file:
+            cfg_file.write('KP_Subtract = left\n')
+        config, _ = self.load()
+        self.assertEqual(self.loads, 2)
+        self.assertEqual(config.get('keys', 'KP_Subtract'), 'left')
+
+        with open(self.cache_path, 'w') as cache_file:
+            cache_file.write('{"key": ')
+        self.load()
+        self.assertEqual(self.loads, 3)
+        self.load()
+        self.assertEqual(self.loads, 3)
+
+
+@unittest.skipIf(sys.version_info < (3, 7), "-X importtime needs Python 3.7")
+class TestImportTime(unittest.TestCase):
+    """Tests for what gets loaded before QuickTile knows it needs X11"""
+
+    def setUp(self):  # type: () -> None
+        # Don't let --show-actions touch the real config or cache files
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.env = dict(os.environ,
+            XDG_CACHE_HOME=os.path.join(self.tmpdir.name, 'cache'),
+            XDG_CONFIG_HOME=self.tmpdir.name)
+
+    def tearDown(self):  # type: () -> None
+        self.tmpdir.cleanup()
+
+    def import_times(self, *args):  # type: (*str) -> Dict[str, int]
+        """Run a fresh interpreter with ``-X importtime`` and return the
+        cumulative import time in microseconds for each module it loaded"""
+        proc = subprocess.run([sys.executable, '-X', 'importtime'] +
+            list(args), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            cwd=os.path.dirname(os.path.abspath(__file__)), env=self.env,
+            universal_newlines=True, check=True)
+
+        times = {}
+        for line in proc.stderr.splitlines():
+            fields = line.split('|')
+            if len(fields) != 3 or not line.startswith('import time:'):
+                continue
+            try:
+                times[fields[2].strip()] = int(fields[1])
+            except ValueError:
+                pass  # Column headings
+        return times
+
+    def assertNotHeavy(self, times):  # type: (Dict[str, int]) -> None
+        """Fail if any of :data:`HEAVY_MODULES` were imported"""
+        self.assertTrue(times, "No -X importtime output found")
+        loaded = [x for x in times if any(x == y or x.startswith(y + '.')
+                                          for y in HEAVY_MODULES)]
+        self.assertEqual(loaded, [])
+
+    def test_package_imports(self):
+        """Import time: the front-end and command registry don't load GI"""
+        times = self.import_times('-c', 'import quicktile.__main__, '
+            'quicktile.client, quicktile.commands, quicktile.layout')
+        self.assertNotHeavy(times)
+        self.assertLess(times['quicktile.__main__'] +
+                        times['quicktile.commands'], IMPORT_BUDGET_US)
+
+    def test_cli_without_x11(self):
+        """Import time: --version and --show-actions don't load GI"""
+        for flag in ('--version', '--show-actions'):
+            self.assertNotHeavy(self.import_times('-m', 'quicktile', flag))
+
+        self.assertTrue(os.path.exists(os.path.join(self.tmpdir.name,
+            'cache', 'quicktile', 'config.json')))
+
+
+class TestWindowManagerCaches(unittest.TestCase):
+    """Tests for `WindowManager`'s caches which don't need an X server"""
+
+    def setUp(self):  # type: () -> None
+        from quicktile.wm import WindowManager
+
+        # pylint: disable=protected-access
+        self.writes = []  # type: List[Tuple[int, List[int]]]
+        self.reads = []  # type: List[int]
+
+        class DummyWindow(object):  # pylint: disable=R0903
+            """Stand-in for both Wnck and python-xlib windows"""
+            def __init__(self, xid, writes=self.writes):
+                self.id = self.xid = xid  # pylint: disable=invalid-name
+                self.writes = writes
+
+            def get_xid(self):
+                """Return the window's XID"""
+                return self.xid
+
+            def change_property(self, _atom, _type, _format, value,
+                                onerror=None):  # pylint: disable=W0613
+                """Record a property write"""
+                self.writes.append((self.xid, value))
+
+        class DummyDisplay(object):
+            """Stand-in for an Xlib display"""
+            flushes = 0
+
+            @staticmethod
+            def create_resource_object(_type, xid):
+                """Wrap an XID"""
+                return DummyWindow(xid)
+
+            def flush(self):
+                """Count flushes"""
+                self.flushes += 1
+
+        def get_property(wid, name, *args):
+            """Record a property read"""
+            self.reads.append(wid)
+            return [3, 1] if name == '_QUICKTILE_CYCLE_POS' else [1, 2, 20, 4]
+
+        winman = self.winman = WindowManager.__new__(WindowManager)
+        winman.x_display = DummyDisplay()
+        winman.watching_struts = True
+        winman._client_list = [1, 2]
+        winman._cycle_pos = {}
+        winman._cycle_pos_dirty = set()
+        winman._cycle_pos_echoes = {}
+        winman._cycle_pos_timer = 1  # Pretend a write-back is scheduled
+        winman._frame_extents = {}
+        winman._catch_badwindow = None
+        winman._transaction_depth = 0
+        winman._x_errors = []
+        winman.gdk_display = DummyDisplay()
+        winman.get_atom = lambda name: 42
+        winman.get_property = get_property
+        self.window = DummyWindow
+
+    def test_cached_reads(self):
+        """WindowManager: cycle positions are only read from X once"""
+        win = self.window(1)
+        self.assertEqual(self.winman.get_cycle_pos(win), (3, 1))
+        self.assertEqual(self.winman.get_cycle_pos(win), (3, 1))
+        self.assertEqual(self.reads, [1])
+
+        self.winman.set_cycle_pos(win, 3, 2)
+        self.assertEqual(self.winman.get_cycle_pos(win), (3, 2))
+        self.assertEqual(self.reads, [1])
+
+    def test_write_behind(self):
+        """WindowManager: cycle position writes are batched"""
+        # pylint: disable=protected-access
+        for xid, pos in ((1, 0), (2, 0), (1, 1), (1, 2)):
+            self.winman.set_cycle_pos(self.window(xid), 5, pos)
+        self.assertEqual(self.writes, [])
+
+        self.winman._write_cycle_pos()
+        self.assertEqual(sorted(self.writes), [(1, [5, 2]), (2, [5, 0])])
+        self.assertEqual(self.winman.x_display.flushes, 1)
+        self.assertEqual(self.winman._cycle_pos_dirty, set())
+
+    def test_frame_extents(self):
+        """WindowManager: frame extents are cached and used for conversion"""
+        from Xlib import X
+        rect = Rectangle(100, 50, 800, 600)
+        client = self.winman.frame_to_client(1, rect)
+        self.assertEqual(client, Rectangle(101, 70, 797, 576))
+        self.assertEqual(self.winman.client_to_frame(1, client), rect)
+        self.assertEqual(self.reads, [1])
+
+        # Changes to _NET_FRAME_EXTENTS invalidate the cache
+        class DummyEvent(object):  # pylint: disable=R0903
+            """Stand-in for a python-xlib PropertyNotify event"""
+            type = X.PropertyNotify
+            window = self.window(1)
+            atom = 43
+
+        self.winman.x_root = self.window(0)
+        self.winman.get_atom = lambda name: {
+            '_NET_CLIENT_LIST': 41, '_NET_FRAME_EXTENTS': 43}.get(name, 42)
+        self.winman.handle_xevent(DummyEvent)
+        self.winman.get_frame_extents(1)
+        self.assertEqual(self.reads, [1, 1])
+
+    def test_partial_strut_scan(self):
+        """WindowManager: partial strut scans keep other windows' entries"""
+        from Xlib import X
+
+        # pylint: disable=protected-access
+        queried = []  # type: List[List[int]]
+
+        def get_struts(wids):
+            """Record the query and give window 2 a panel reservation"""
+            queried.append(list(wids))
+            return [StrutPartial(top=30) if x == 2 else None for x in wids]
+
+        class DummyScreen(object):  # pylint: disable=R0903
+            """Stand-in for a Wnck.Screen with no docks"""
+            @staticmethod
+            def get_windows():
+                """Return no windows"""
+                return []
+
+        winman = self.winman
+        winman.x_root = self.window(0)
+        winman.screen = DummyScreen()
+        winman.strut_scan_interval = 60
+        winman.usable_region = UsableRegion()
+        winman._panels = None
+        winman._last_full_scan = None
+        winman._struts = {}
+        winman._get_struts = get_struts
+        winman.get_atom = lambda name: {
+            '_NET_CLIENT_LIST': 41, '_NET_WM_STRUT_PARTIAL': 45}.get(name, 42)
+
+        winman.get_property = lambda *args: [1, 2, 3]
+        winman._scan_struts()
+        self.assertEqual(queried, [[0, 1, 2, 3]])
+
+        # Window 3 goes away and only root and the panel get asked again
+        winman.get_property = lambda *args: [1, 2]
+        winman._scan_struts()
+        self.assertEqual(queried[-1], [0, 2])
+        self.assertEqual(sorted(winman._struts), [0, 1, 2])
+
+        # A window without a reservation still gets refetched when it adds one
+        class DummyEvent(object):  # pylint: disable=R0903
+            """Stand-in for a python-xlib PropertyNotify event"""
+            type = X.PropertyNotify
+            window = self.window(1)
+            atom = 45
+
+        winman.handle_xevent(DummyEvent)
+        self.assertEqual(queried[-1], [1])
+
+    def test_get_struts(self):
+        """WindowManager: struts are batched with a _NET_WM_STRUT fallback"""
+        queried = []  # type: List[Tuple[List[int], str]]
+        values = {
+            '_NET_WM_STRUT_PARTIAL': {1: [0, 0, 30, 0] + [0] * 8},
+            '_NET_WM_STRUT': {2: [20, 0, 0, 0], 3: None},
+        }
+
+        def get_properties(wids, name, _type):
+            """Record the batch and answer it from ``values``"""
+            queried.append((list(wids), name))
+            return [values[name].get(x) for x in wids]
+
+        self.winman.get_properties = get_properties
+        struts = self.winman._get_struts([1, 2, 3])  # pylint: disable=W0212
+
+        # One request for all windows, then one for those lacking the first
+        self.assertEqual(queried, [([1, 2, 3], '_NET_WM_STRUT_PARTIAL'),
+                                   ([2, 3], '_NET_WM_STRUT')])
+        self.assertEqual(struts, [
+            StrutPartial(*values['_NET_WM_STRUT_PARTIAL'][1]),
+            StrutPartial(*values['_NET_WM_STRUT'][2]), None])
+
+    def test_unwatched_window(self):
+        """WindowManager: cycle positions for unknown windows aren't cached"""
+        win = self.window(7)
+        self.winman.get_cycle_pos(win)
+        self.winman.get_cycle_pos(win)
+        self.assertEqual(self.reads, [7, 7])
+
+
+class TestQuickTileApp(unittest.TestCase):
+    """Tests for the `QuickTileApp` class"""
+
+    def test_shutdown(self):
+        """QuickTileApp: shutting down writes back state and closes up"""
+        calls = []
+
+        class FlushingWinMan(DummyWinMan):
+            """DummyWinMan which records flushes of queued cycle positions"""
+            @staticmethod
+            def flush_cycle_pos():
+                """Record the flush"""
+                calls.append('flush')
+
+        class DummySocket(object):  # pylint: disable=too-few-public-methods
+            """Stand-in for ControlSocket"""
+            @staticmethod
+            def close():
+                """Record the close"""
+                calls.append('close')
+
+        app = __main__.QuickTileApp(FlushingWinMan(),
+                                    commands.CommandRegistry(), {})
+        app._control_socket = DummySocket()  # pylint: disable=W0212
+        app.shutdown()
+        self.assertEqual(calls, ['flush', 'close'])
+
+        # A second shutdown doesn't close the socket again
+        app.shutdown()
+        self.assertEqual(calls, ['flush', 'close', 'flush'])
+
 
 class TestHelpers(unittest.TestCase):
     """Tests for loose functions
@@ -579,6 +1387,59 @@ class TestRectangle(unittest.TestCase):  # pylint: disable=R0904
         self.assertEqual(self.rect1.y2, self.rect1.y + self.rect1.height)
 
 
+class TestRectangleArray(unittest.TestCase):
+    """Tests for the `RectangleArray` class"""
+
+    def setUp(self):  # type: () -> None
+        rng = random.Random(1234)
+
+        def rand_rect():  # type: () -> Rectangle
+            """Generate a small rectangle so overlaps and ties are common"""
+            return Rectangle(rng.randint(-20, 60), rng.randint(-20, 60),
+                             rng.randint(0, 40), rng.randint(0, 40))
+
+        self.rects = [rand_rect() for _ in range(500)]
+        self.others = [rand_rect() for _ in range(500)]
+        self.candidates = [rand_rect() for _ in range(5)]
+
+    def test_construction(self):
+        """RectangleArray: round-trips its contents"""
+        rects = RectangleArray(self.rects)
+        self.assertEqual(len(rects), len(self.rects))
+        self.assertEqual(list(rects), self.rects)
+        self.assertEqual(rects[3], self.rects[3])
+        self.assertEqual(rects, RectangleArray(self.rects))
+        self.assertNotEqual(rects, RectangleArray(self.rects[1:]))
+        self.assertEqual(list(RectangleArray()), [])
+
+        self.assertRaises(TypeError, RectangleArray, [(1, 2, 3, 4)])
+
+    def test_matches_scalar(self):
+        """RectangleArray: results match the Rectangle methods"""
+        rects = RectangleArray(self.rects)
+        others = RectangleArray(self.others)
+        single = self.others[0]
+
+        for method in ('intersect', 'union', 'subtract',
+                       'from_relative', 'to_relative'):
+            self.assertEqual(list(getattr(rects, method)(others)),
+                [getattr(x, method)(y)
+                 for x, y in zip(self.rects, self.others)], method)
+            self.assertEqual(list(getattr(rects, method)(single)),
+                [getattr(x, method)(single) for x in self.rects], method)
+
+        self.assertEqual(list(rects.closest_of(self.candidates)),
+            [x.closest_of(self.candidates) for x in self.rects])
+
+    def test_bad_arguments(self):
+        """RectangleArray: rejects mismatched arguments"""
+        rects = RectangleArray(self.rects)
+        self.assertRaises(TypeError, rects.intersect, (1, 2, 3, 4))
+        self.assertRaises(ValueError, rects.intersect,
+                          RectangleArray(self.others[:10]))
+        self.assertRaises(ValueError, rects.closest_of, [])
+
+
 class TestUsableRegion(unittest.TestCase):
     """Tests for my per-monitor ``_NET_WORKAREA`` calculation class"""
 
@@ -679,6 +1540,44 @@ class TestUsableRegion(unittest.TestCase):
             Rectangle(3300, 640, 1, 1)),
             Rectangle(x=3200, y=56, width=1280, height=1024))
 
+    def test_find_monitor_id_for(self):
+        """UsableRegion: find_monitor_id_for"""
+        test_region = UsableRegion()
+        self.assertIsNone(
+            test_region.find_monitor_id_for(Rectangle(0, 0, 1, 1)))
+
+        # Zero-area monitors must not throw off the IDs of the others
+        monitors = [
+            Rectangle(0, 56, 1280, 1024),
+            Rectangle(0, 0, 0, 0),
+            Rectangle(1280, 0, 1920, 1080),
+            Rectangle(3200, 56, 1280, 1024)]
+        test_region.set_monitors(monitors)
+        self.assertEqual(test_region.monitors, monitors)
+
+        self.assertEqual(test_region.find_monitor_id_for(
+            Rectangle(-3, 1, 1, 1)), (0, monitors[0]))
+        self.assertEqual(test_region.find_monitor_id_for(
+            Rectangle(1200, 0, 400, 400)), (2, monitors[2]))
+        self.assertEqual(test_region.find_monitor_id_for(
+            Rectangle(5000, 5000, 10, 10)), (3, monitors[3]))
+
+    def test_find_monitor_ids_for(self):
+        """UsableRegion: find_monitor_ids_for matches find_monitor_id_for"""
+        test_region = UsableRegion()
+        rects = RectangleArray([Rectangle(-3, 1, 1, 1),
+                                Rectangle(1200, 0, 400, 400),
+                                Rectangle(5000, 5000, 10, 10)])
+        self.assertEqual(test_region.find_monitor_ids_for(rects), [])
+
+        test_region.set_monitors([
+            Rectangle(0, 56, 1280, 1024),
+            Rectangle(0, 0, 0, 0),
+            Rectangle(1280, 0, 1920, 1080),
+            Rectangle(3200, 56, 1280, 1024)])
+        self.assertEqual(test_region.find_monitor_ids_for(rects),
+                         [test_region.find_monitor_id_for(x) for x in rects])
+
     def test_clip_to_usable_region(self):
         """UsableRegion: clip_to_usable_region"""
         test_region = UsableRegion()
@@ -947,6 +1846,49 @@ class TestUsableRegion(unittest.TestCase):
             Rectangle(960, 0, 960, 1080)),
             Rectangle(x=960, y=0, width=960, height=1080 - 33))
 
+    def test_set_workareas(self):
+        """UsableRegion: set_workareas"""
+        monitors = [Rectangle(0, 0, 1280, 1024),
+                    Rectangle(1280, 0, 1920, 1080)]
+        test_region = UsableRegion()
+        test_region.set_monitors(monitors)
+        test_region.set_panels([
+            StrutPartial(0, 0, 0, 30, 0, 0, 0, 0, 0, 0, 0, 3199)])
+
+        # A single _NET_WORKAREA can't describe per-monitor panels
+        self.assertFalse(test_region.set_workareas(
+            [Rectangle(0, 0, 3200, 1050)]))
+        self.assertEqual(test_region.clip_to_usable_region(
+            Rectangle(1280, 0, 1920, 1080)), Rectangle(1280, 0, 1920, 1050))
+
+        # Missing or mismatched work areas are rejected too
+        self.assertFalse(test_region.set_workareas(None))
+        self.assertFalse(test_region.set_workareas(
+            [Rectangle(0, 0, 1280, 1000)]))
+        self.assertFalse(test_region.set_workareas(
+            [Rectangle(0, 0, 1280, 1000), Rectangle(0, 0, 1280, 990)]))
+
+        # One work area per monitor takes precedence over the struts
+        self.assertTrue(test_region.set_workareas([
+            Rectangle(0, 24, 1280, 1000), Rectangle(1280, 0, 1920, 1040)]))
+        self.assertEqual(test_region.clip_to_usable_region(
+            Rectangle(0, 0, 640, 1024)), Rectangle(0, 24, 640, 1000))
+        self.assertEqual(test_region.clip_to_usable_region(
+            Rectangle(1280, 0, 1920, 1080)), Rectangle(1280, 0, 1920, 1040))
+        self.assertEqual(test_region.move_to_usable_region(
+            Rectangle(5, 0, 10, 10)), Rectangle(5, 24, 10, 10))
+        self.assertEqual(test_region.move_to_usable_region(
+            Rectangle(1400, 1075, 10, 10)), Rectangle(1400, 1030, 10, 10))
+
+        # A single monitor can use _NET_WORKAREA
+        test_region.set_monitors(monitors[:1])
+        self.assertTrue(test_region.set_workareas(
+            [Rectangle(0, 0, 1280, 1000)]))
+
+        test_region = UsableRegion()
+        with self.assertRaises(TypeError):
+            test_region.set_workareas([(0, 0, 1280, 1000)])
+
     def test_update_no_valid_monitors(self):
         """UsableRegion: Empty list of monitors doesn't raise exception"""
         UsableRegion().set_monitors([])
@@ -1008,4 +1950,44 @@ class TestUsableRegion(unittest.TestCase):
             "top_start_x=9, top_end_x=10, bottom_start_x=11, bottom_end_x=12)]"
             ">)")
 
+
+class TestPresetTable(unittest.TestCase):
+    """Tests for the `PresetTable` class"""
+
+    def test_column_counts(self):
+        """PresetTable: per-monitor ColumnCount with last entry repeating"""
+        table = PresetTable([3, 4])
+        self.assertEqual(len(table.layout_for(0)['left']), 3)
+        self.assertEqual(len(table.layout_for(1)['left']), 4)
+        self.assertEqual(len(table.layout_for(5)['left']), 4)
+        self.assertEqual(table.default_layout, table.layout_for(0))
+        self.assertRaises(ValueError, PresetTable, [])
+        self.assertRaises(ValueError, PresetTable, [3, 0])
+
+    def test_compiled_presets(self):
+        """PresetTable: matches resolving and clipping presets on demand"""
+        region = UsableRegion()
+        region.set_monitors([Rectangle(0, 0, 1280, 1024),
+                             Rectangle(1280, 0, 1920, 1080)])
+        region.set_panels([StrutPartial(top=30, top_start_x=0,
+                                        top_end_x=1279)])
+        table = PresetTable([3, 2])
+
+        for monitor_id, monitor in enumerate(region.monitors):
+            for command, presets in table.layout_for(monitor_id).items():
+                expected = [region.clip_to_usable_region(Rectangle(
+                    x[0] * monitor.width, x[1] * monitor.height,
+                    x[2] * monitor.width, x[3] * monitor.height
+                ).from_relative(monitor)) for x in presets]
+                self.assertEqual(table.get(region, monitor_id, command),
+                                 expected)
+
+        self.assertIsNone(table.get(region, 2, 'left'))
+        self.assertIsNone(table.get(region, 0, 'no-such-command'))
+
+        # Changing the region invalidates the table
+        region.set_panels([])
+        self.assertEqual(table.get(region, 0, 'top')[0],
+                         Rectangle(0, 0, 1280, 512))
+
 # vim: set sw=4 sts=4 expandtab :